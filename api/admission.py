@@ -0,0 +1,242 @@
+# backend/api/admission.py
+
+import math
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Deque, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from ninja.errors import Throttled
+
+# Admission control for the LLM-backed endpoints. Each worker process
+# runs at most LLM_MAX_CONCURRENT generations, at most
+# LLM_USER_CONCURRENCY of them for any one user, and hands freed slots
+# to waiting users round-robin so one heavy user cannot starve the rest.
+# When the queue is full we answer 429 straight away with a Retry-After
+# derived from queue depth and the observed generation time.
+
+_local = threading.local()
+
+
+class _Ticket:
+    __slots__ = ("granted",)
+
+    def __init__(self):
+        self.granted = False
+
+
+class FairScheduler:
+    def __init__(self, slots: int, per_user: int, max_queue: int, per_user_queue: int):
+        self.slots = slots
+        self.per_user = per_user
+        self.max_queue = max_queue
+        self.per_user_queue = per_user_queue
+        self.cond = threading.Condition()
+        self.running = 0
+        self.running_by_user: Counter = Counter()
+        self.waiting: Dict[int, Deque[_Ticket]] = {}
+        self.turns: Deque[int] = deque()  # users with waiting tickets, in round-robin order
+        self.avg_seconds = 30.0
+
+    @property
+    def depth(self) -> int:
+        return sum(len(q) for q in self.waiting.values())
+
+    def retry_after(self) -> int:
+        # everyone ahead has to clear `slots` at a time
+        return max(1, math.ceil((self.depth + 1) / self.slots * self.avg_seconds))
+
+    def acquire(self, user_id: int, timeout: float) -> None:
+        with self.cond:
+            if not self.turns and self._can_run(user_id):
+                self._start(user_id)
+                return
+            if self.depth >= self.max_queue or len(self.waiting.get(user_id, ())) >= self.per_user_queue:
+                raise Throttled(wait=self.retry_after())
+
+            ticket = _Ticket()
+            if user_id not in self.waiting:
+                self.waiting[user_id] = deque()
+                self.turns.append(user_id)
+            self.waiting[user_id].append(ticket)
+            self._dispatch()
+
+            deadline = time.monotonic() + timeout
+            while not ticket.granted:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    self._forget(user_id, ticket)
+                    raise Throttled(wait=self.retry_after())
+                self.cond.wait(left)
+
+    def try_acquire(self, user_id: int) -> bool:
+        """Take a slot only if one is free now and nobody is waiting."""
+        with self.cond:
+            if not self.turns and self._can_run(user_id):
+                self._start(user_id)
+                return True
+            return False
+
+    def release(self, user_id: int, elapsed: float) -> None:
+        with self.cond:
+            self.running -= 1
+            self.running_by_user[user_id] -= 1
+            if self.running_by_user[user_id] <= 0:
+                del self.running_by_user[user_id]
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * elapsed
+            self._dispatch()
+
+    def _can_run(self, user_id: int) -> bool:
+        return self.running < self.slots and self.running_by_user[user_id] < self.per_user
+
+    def _start(self, user_id: int) -> None:
+        self.running += 1
+        self.running_by_user[user_id] += 1
+
+    def _dispatch(self) -> None:
+        granted = False
+        for _ in range(len(self.turns)):
+            if self.running >= self.slots:
+                break
+            user_id = self.turns.popleft()
+            if self._can_run(user_id):
+                self.waiting[user_id].popleft().granted = True
+                self._start(user_id)
+                granted = True
+            if self.waiting[user_id]:
+                self.turns.append(user_id)
+            else:
+                del self.waiting[user_id]
+        if granted:
+            self.cond.notify_all()
+
+    def _forget(self, user_id: int, ticket: _Ticket) -> None:
+        queue = self.waiting.get(user_id)
+        if queue is None:
+            return
+        queue.remove(ticket)
+        if not queue:
+            del self.waiting[user_id]
+            self.turns.remove(user_id)
+
+
+scheduler = FairScheduler(
+    slots=settings.LLM_MAX_CONCURRENT,
+    per_user=settings.LLM_USER_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    per_user_queue=settings.LLM_USER_QUEUE,
+)
+
+
+def _budget_key(user_id: int) -> tuple:
+    window = settings.LLM_BUDGET_WINDOW
+    start = int(time.time() // window) * window
+    return f"llm-tokens:{user_id}:{start}", start + window
+
+
+def check_budget(user_id: int) -> None:
+    key, reset_at = _budget_key(user_id)
+    if cache.get(key, 0) >= settings.LLM_USER_TOKEN_BUDGET:
+        raise Throttled(wait=max(1, math.ceil(reset_at - time.time())))
+
+
+def current_user():
+    """Id of the user whose admitted job is running on this thread, if any."""
+    return getattr(_local, "user_id", None)
+
+
+def charge(tokens: int, user_id: int = None) -> None:
+    """Add LLM tokens to the budget of ``user_id``, by default the user whose job is running on this thread."""
+    if user_id is None:
+        user_id = current_user()
+    if user_id is None or not tokens:
+        return
+    key, _ = _budget_key(user_id)
+    cache.add(key, 0, timeout=settings.LLM_BUDGET_WINDOW)
+    try:
+        cache.incr(key, tokens)
+    except ValueError:  # expired between add and incr
+        cache.set(key, tokens, timeout=settings.LLM_BUDGET_WINDOW)
+
+
+@contextmanager
+def admit(user_id: int):
+    """
+    Run an LLM job for ``user_id`` under the per-user budget and the fair
+    scheduler. Re-entrant: nested jobs on the same thread share the slot.
+    """
+    if getattr(_local, "system", False) or getattr(_local, "user_id", None) == user_id:
+        yield
+        return
+
+    check_budget(user_id)
+    scheduler.acquire(user_id, timeout=settings.LLM_QUEUE_TIMEOUT)
+    started = time.monotonic()
+    _local.user_id = user_id
+    try:
+        yield
+    finally:
+        _local.user_id = None
+        scheduler.release(user_id, time.monotonic() - started)
+
+
+@contextmanager
+def system():
+    """
+    Run this thread's LLM jobs outside admission control: no slot, no
+    queue, no token budget. For batch commands such as prewarm, which pace
+    themselves with :func:`api.llm.set_rate`.
+    """
+    previous = getattr(_local, "system", False)
+    _local.system = True
+    try:
+        yield
+    finally:
+        _local.system = previous
+
+
+@contextmanager
+def extra_slots(user_id: int, wanted: int):
+    """
+    For an admitted job that fans out to threads: take up to ``wanted``
+    more of ``user_id``'s slots, only those free right now, and yield how
+    many were taken. The job may then run ``1 + taken`` generations at
+    once, so LLM_USER_CONCURRENCY holds across its threads.
+    """
+    taken = 0
+    while taken < wanted and scheduler.try_acquire(user_id):
+        taken += 1
+    started = time.monotonic()
+    try:
+        yield taken
+    finally:
+        for _ in range(taken):
+            scheduler.release(user_id, time.monotonic() - started)
+
+
+@contextmanager
+def on_behalf_of(user_id: int):
+    """
+    Charge LLM use on this (pool) thread to ``user_id``, whose admitted
+    job spawned it. Takes no scheduler slot of its own; size the pool
+    with :func:`extra_slots`.
+    """
+    previous = getattr(_local, "user_id", None)
+    _local.user_id = user_id
+    try:
+        yield
+    finally:
+        _local.user_id = previous
+
+
+def admitted(func):
+    """Decorator form of :func:`admit` for functions taking ``request`` first."""
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        with admit(request.user.id):
+            return func(request, *args, **kwargs)
+    return wrapper
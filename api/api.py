@@ -1,15 +1,28 @@
+import math
 from ninja import NinjaAPI
+from ninja.errors import Throttled
 from .routers import items
 from .routers import auth
 from .routers import courses
 from ninja_simple_jwt.auth.views.api import mobile_auth_router
 from .routers import topics
+from .routers import batch
+from .renderers import ORJSONRenderer
 
-api = NinjaAPI()
+api = NinjaAPI(renderer=ORJSONRenderer())
 
 # Example API
 api.add_router("/items/", items.router)
 api.add_router("/auth/", auth.router)
 api.add_router("/auth/", mobile_auth_router)
 api.add_router("/courses/", courses.router)
-api.add_router("/", topics.router)
\ No newline at end of file
+api.add_router("/", topics.router)
+api.add_router("/batch/", batch.router)
+
+@api.exception_handler(Throttled)
+def throttled(request, exc):
+    # Ninja only sets Retry-After for its own throttles; ours come from views
+    response = api.create_response(request, {"detail": str(exc)}, status=429)
+    if exc.wait is not None:
+        response["Retry-After"] = str(math.ceil(exc.wait))
+    return response
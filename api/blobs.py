@@ -0,0 +1,66 @@
+# backend/api/blobs.py
+
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from api import profiling
+from api.models import Blob, Summary
+
+
+def file_digest(uploaded) -> str:
+    # set by the hashing upload handlers; hash here only if they were bypassed
+    digest = getattr(uploaded, "sha256", None)
+    if digest:
+        return digest
+    sha = hashlib.sha256()
+    for chunk in uploaded.chunks():
+        sha.update(chunk)
+    uploaded.seek(0)
+    return sha.hexdigest()
+
+
+def acquire_blob(uploaded):
+    """
+    Return ``(blob, created)`` for the uploaded file's content, taking one
+    reference. Identical content is stored once, whoever uploads it.
+    """
+    digest = file_digest(uploaded)
+    updated = Blob.objects.filter(sha256=digest).update(refcount=F("refcount") + 1)
+    if updated:
+        return Blob.objects.get(sha256=digest), False
+
+    blob = Blob(sha256=digest, size=uploaded.size, refcount=1)
+    with profiling.external():
+        blob.file.save(uploaded.name, uploaded, save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+        return blob, True
+    except IntegrityError:
+        # lost a race with an identical upload; drop our copy and share theirs
+        blob.file.delete(save=False)
+        Blob.objects.filter(sha256=digest).update(refcount=F("refcount") + 1)
+        return Blob.objects.get(sha256=digest), False
+
+
+def release_blob(blob_id: int) -> None:
+    """
+    Drop one reference. The blob and its stored file are removed once the
+    last reference is gone and the transaction that released it commits.
+    """
+    Blob.objects.filter(pk=blob_id).update(refcount=F("refcount") - 1)
+    transaction.on_commit(lambda: _collect(blob_id))
+
+
+def _collect(blob_id: int) -> None:
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(pk=blob_id, refcount__lte=0).first()
+        if blob is None or blob.topics.exists():
+            return
+        name = blob.file.name
+        blob.delete()
+        Summary.objects.filter(source=name).delete()
+    if name:
+        Blob._meta.get_field("file").storage.delete(name)
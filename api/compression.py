@@ -0,0 +1,134 @@
+# backend/api/compression.py
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List
+
+from api.registry import lazy_module
+from api.scoring import tfidf_matrix
+
+np = lazy_module("numpy")
+
+PAGE_NUMBER = re.compile(r"(page\s*)?#+(\s*(/|of)\s*#+)?", re.I)
+REFERENCES = re.compile(r"(references|bibliography|works cited|reference list)\s*:?", re.I)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; good enough for reporting
+    return len(text) // 4
+
+
+@dataclass
+class CompressionReport:
+    raw_tokens: int = 0
+    boilerplate_tokens: int = 0
+    trimmed_tokens: int = 0
+
+    @property
+    def sent_tokens(self) -> int:
+        return self.raw_tokens - self.boilerplate_tokens - self.trimmed_tokens
+
+    @property
+    def saved_ratio(self) -> float:
+        if not self.raw_tokens:
+            return 0.0
+        return 1 - self.sent_tokens / self.raw_tokens
+
+
+def _line_key(line: str) -> str:
+    # page numbers and dates vary per page, the footer around them doesn't
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+
+def strip_page_furniture(pages: List[str], edge: int = 3, min_share: float = 0.5) -> List[str]:
+    """
+    Drop running headers/footers and bare page numbers.
+
+    A line counts as furniture when it sits among the first or last
+    ``edge`` non-empty lines of a page and the same line (digits
+    ignored) is found at a page edge on at least ``min_share`` of pages.
+    """
+    split = [p.splitlines() for p in pages]
+    edges = []
+    for lines in split:
+        nonempty = [i for i, L in enumerate(lines) if L.strip()]
+        edges.append(set(nonempty[:edge] + nonempty[-edge:]))
+
+    counts = Counter()
+    for lines, idx in zip(split, edges):
+        counts.update({_line_key(lines[i]) for i in idx})
+    limit = max(3, min_share * len(pages))
+    repeated = {k for k, c in counts.items() if c >= limit}
+
+    out = []
+    for lines, idx in zip(split, edges):
+        kept = []
+        for i, L in enumerate(lines):
+            if i in idx:
+                key = _line_key(L)
+                if key in repeated or PAGE_NUMBER.fullmatch(key):
+                    continue
+            kept.append(L)
+        out.append("\n".join(kept))
+    return out
+
+
+def drop_references(text: str, tail: float = 0.3) -> str:
+    """Cut a trailing references/bibliography section found in the last ``tail`` of the text."""
+    lines = text.splitlines()
+    start = int(len(lines) * (1 - tail))
+    for i in range(len(lines) - 1, start - 1, -1):
+        if REFERENCES.fullmatch(lines[i].strip()):
+            return "\n".join(lines[:i])
+    return text
+
+
+def _units(text: str) -> List[str]:
+    units = []
+    for line in text.splitlines():
+        if line.strip():
+            units.extend(s for s in SENTENCE_END.split(line.strip()) if s)
+    return units
+
+
+def textrank(m: np.ndarray, damping: float = 0.85, iters: int = 30) -> np.ndarray:
+    """PageRank over the cosine-similarity graph of the TF-IDF rows in ``m``."""
+    sim = m @ m.T
+    np.fill_diagonal(sim, 0.0)
+    out = sim.sum(axis=1, keepdims=True)
+    out[out == 0] = 1.0
+    trans = sim / out
+    n = len(m)
+    score = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iters):
+        score = (1 - damping) / n + damping * (trans.T @ score)
+    return score
+
+
+def compress_chunk(text: str, ratio: float) -> str:
+    """
+    Keep the highest-ranked sentences of ``text`` until roughly ``ratio``
+    of its tokens remain, in original order. Formulas (lines with ``=``)
+    are always kept since TF-IDF can't see their value.
+    """
+    if ratio >= 1.0:
+        return text
+    units = _units(text)
+    if len(units) < 5:
+        return text
+
+    score = textrank(tfidf_matrix(units))
+    budget = estimate_tokens(text) * ratio
+    keep = {i for i, u in enumerate(units) if "=" in u}
+    used = sum(estimate_tokens(units[i]) for i in keep)
+    for i in np.argsort(-score):
+        if used >= budget:
+            break
+        if i not in keep:
+            keep.add(int(i))
+            used += estimate_tokens(units[i])
+    return "\n".join(u for i, u in enumerate(units) if i in keep)
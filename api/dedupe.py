@@ -0,0 +1,135 @@
+# backend/api/dedupe.py
+
+from __future__ import annotations
+
+import re
+import zlib
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple, TypeVar
+
+from api.registry import lazy_module
+
+np = lazy_module("numpy")
+
+T = TypeVar("T")
+
+# MinHash parameters. 64 permutations keeps the signature cheap while the
+# exact Jaccard check on LSH candidates removes any estimation error.
+NUM_PERM = 64
+SHINGLE_SIZE = 5
+_PRIME = (1 << 31) - 1
+
+
+@lru_cache(maxsize=1)
+def _permutations() -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(1729)
+    a = rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+def normalize(text: str) -> str:
+    text = re.sub(r"^\s*(q\d*|question)\s*[:.)]\s*", "", text.lower())
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> frozenset:
+    norm = normalize(text)
+    if len(norm) <= k:
+        return frozenset([norm]) if norm else frozenset()
+    return frozenset(norm[i : i + k] for i in range(len(norm) - k + 1))
+
+
+def numbers(text: str) -> Tuple[str, ...]:
+    """Numeric tokens of ``text``; "x^2" and "x^3" share all but one shingle but not these."""
+    return tuple(sorted(re.findall(r"\d+", normalize(text))))
+
+
+def minhash(sh: frozenset) -> np.ndarray:
+    if not sh:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    h = np.fromiter(
+        (zlib.crc32(s.encode()) for s in sh), dtype=np.uint64, count=len(sh)
+    )
+    # (a * h + b) mod p for every permutation at once; a < 2**31 and
+    # h < 2**32 so the product stays inside uint64.
+    a, b = _permutations()
+    return ((np.outer(a, h) + b[:, None]) % _PRIME).min(axis=1)
+
+
+def lsh_bands(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) with bands * rows == num_perm whose LSH
+    S-curve midpoint (1/b)^(1/r) sits closest to, but not above,
+    the similarity threshold, so true duplicates are rarely missed.
+    """
+    best = (num_perm, 1)
+    best_gap = float("inf")
+    for r in range(1, num_perm + 1):
+        if num_perm % r:
+            continue
+        b = num_perm // r
+        mid = (1 / b) ** (1 / r)
+        if mid <= threshold and threshold - mid < best_gap:
+            best, best_gap = (b, r), threshold - mid
+    return best
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def dedupe(
+    items: Sequence[T],
+    key: Callable[[T], str],
+    threshold: float = 0.8,
+) -> List[T]:
+    """
+    Drop near-duplicate items, keeping the first occurrence.
+
+    Items are bucketed by MinHash LSH bands over character shingles of
+    ``key(item)``; only items sharing a bucket are compared exactly, so
+    the pass is linear in ``len(items)`` on realistic inputs. Items whose
+    numbers differ are never duplicates, however similar the wording.
+    """
+    if threshold >= 1.0:
+        return list(items)
+
+    bands, rows = lsh_bands(threshold)
+    buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+    kept: List[T] = []
+    kept_sh: List[frozenset] = []
+    kept_nums: List[Tuple[str, ...]] = []
+
+    for item in items:
+        text = key(item)
+        sh = shingles(text)
+        nums = numbers(text)
+        sig = minhash(sh)
+        keys = [sig[i * rows : (i + 1) * rows].tobytes() for i in range(bands)]
+
+        seen = set()
+        duplicate = False
+        for band, k in zip(buckets, keys):
+            for idx in band.get(k, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                if nums == kept_nums[idx] and jaccard(sh, kept_sh[idx]) >= threshold:
+                    duplicate = True
+                    break
+            if duplicate:
+                break
+        if duplicate:
+            continue
+
+        idx = len(kept)
+        kept.append(item)
+        kept_sh.append(sh)
+        kept_nums.append(nums)
+        for band, k in zip(buckets, keys):
+            band.setdefault(k, []).append(idx)
+    return kept
@@ -0,0 +1,40 @@
+# backend/api/embeddings.py
+
+from __future__ import annotations
+
+from typing import List
+
+from django.conf import settings
+
+from api import registry
+
+np = registry.lazy_module("numpy")
+
+BATCH_SIZE = 64
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Embed ``texts`` with the local Ollama model and return an
+    L2-normalised float32 matrix, so cosine similarity is a dot product.
+    """
+    rows = []
+    for i in range(0, len(texts), BATCH_SIZE):
+        resp = registry.get("ollama").embed(
+            model=settings.EMBEDDING_MODEL, input=texts[i : i + BATCH_SIZE]
+        )
+        rows.extend(resp.embeddings)
+    vecs = np.asarray(rows, dtype=np.float32)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+
+def top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> List[int]:
+    """Indices of the ``k`` rows of ``matrix`` most similar to ``query``, best first."""
+    if not len(matrix):
+        return []
+    scores = matrix @ query
+    k = min(k, len(scores))
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])].tolist()
@@ -0,0 +1,70 @@
+# backend/api/etag.py
+
+import hashlib
+from functools import wraps
+
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from ninja.decorators import decorate_view
+
+# clients may keep the body but must revalidate before every use
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(repr(p).encode())
+        h.update(b"\0")
+    return f'"{h.hexdigest()}"'
+
+
+def _matches(request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison; compressed responses carry W/ tags
+    etags = {e[2:] if e.startswith("W/") else e for e in parse_etags(header)}
+    return "*" in etags or etag in etags
+
+
+def _tag_responses(cache_control: str):
+    # wraps Operation.run, so it sees the final HttpResponse
+    def decorator(run):
+        @wraps(run)
+        def tagged(request, **kw):
+            response = run(request, **kw)
+            etag = getattr(request, "etag", None)
+            if etag and response.status_code == 200:
+                response["ETag"] = etag
+                response["Cache-Control"] = cache_control
+            return response
+        return tagged
+    return decorator
+
+
+def conditional(etag_func, cache_control: str = DEFAULT_CACHE_CONTROL):
+    """
+    Answer ``If-None-Match`` with 304 before the view runs.
+
+    ``etag_func(request, **view_kwargs)`` is called after authentication
+    and must be cheap: a version lookup, never serialization or
+    generation. Returning ``None`` skips the check (e.g. the resource
+    does not exist yet). Successful responses carry the ETag and
+    ``Cache-Control``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = etag_func(request, **kwargs)
+            request.etag = etag
+            if etag and _matches(request, etag):
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                response["Cache-Control"] = cache_control
+                return response
+            return view(request, *args, **kwargs)
+
+        return decorate_view(_tag_responses(cache_control))(wrapper)
+
+    return decorator
@@ -0,0 +1,336 @@
+# backend/api/export.py
+
+import csv
+import hashlib
+import html
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+from django.utils.text import slugify
+
+from api.models import Course, Flashcard, QuizQuestion, Summary, Topic
+from api.routers.topics import SUMMARY_VERSION
+
+# Exports are streamed: every generator here yields small byte chunks
+# while it walks the database with .iterator(), so memory stays flat no
+# matter how many topics or cards a course has. Only stored artifacts
+# are exported; nothing is generated on the way out.
+
+ROWS_PER_QUERY = 500
+READ_SIZE = 64 * 1024
+
+Entry = Tuple[str, Iterable[bytes]]
+
+
+class _Sink:
+    """Write-only, non-seekable file for ZipFile that hands back what was written."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[Entry]) -> Iterator[bytes]:
+    """Zip ``(name, chunks)`` entries on the fly, yielding compressed bytes as they are produced."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, chunks in entries:
+            # size is unknown up front; allow entries past 2 GiB
+            with zf.open(name, "w", force_zip64=True) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+    # local headers are done; what is left is the central directory
+    yield sink.drain()
+
+
+def _csv_rows(header, rows) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= READ_SIZE:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode()
+
+
+def _flashcards(topic_id: int):
+    return (
+        Flashcard.objects.filter(topic_id=topic_id)
+        .only("question", "answer").iterator(chunk_size=ROWS_PER_QUERY)
+    )
+
+
+def _quiz(topic_id: int):
+    return (
+        QuizQuestion.objects.filter(topic_id=topic_id)
+        .only("question", "choices", "answer").iterator(chunk_size=ROWS_PER_QUERY)
+    )
+
+
+def _topics(course: Course):
+    return list(Topic.objects.filter(course=course).order_by("created_at").only("id", "name", "file"))
+
+
+def _folder(position: int, topic: Topic) -> str:
+    return f"{position:02d}-{slugify(topic.name) or f'topic-{topic.id}'}"
+
+
+def flashcards_csv(topic_id: int) -> Iterator[bytes]:
+    return _csv_rows(["question", "answer"], ((c.question, c.answer) for c in _flashcards(topic_id)))
+
+
+def quiz_csv(topic_id: int) -> Iterator[bytes]:
+    # choices trail the fixed columns, one cell each
+    return _csv_rows(
+        ["question", "answer", "choices"],
+        ([q.question, q.answer, *q.choices] for q in _quiz(topic_id)),
+    )
+
+
+def _summary(topic: Topic):
+    # the stored whole-file notes, if the topic was ever summarized
+    if not topic.file:
+        return None
+    return (
+        Summary.objects.filter(source=topic.file.name, pages="", version=SUMMARY_VERSION)
+        .values_list("text", flat=True).first()
+    )
+
+
+def notes_md(topic: Topic) -> Iterator[bytes]:
+    yield f"# {topic.name}\n\n".encode()
+    summary = _summary(topic)
+    if summary:
+        yield f"## Summary\n\n{summary}\n\n".encode()
+    yield b"## Flashcards\n\n"
+    for c in _flashcards(topic.id):
+        yield f"**Q:** {c.question}\n\n**A:** {c.answer}\n\n".encode()
+    yield b"## Quiz\n\n"
+    for i, q in enumerate(_quiz(topic.id), 1):
+        lines = [f"{i}. {q.question}"]
+        lines += [f"   - {chr(65 + j)}. {choice}" for j, choice in enumerate(q.choices)]
+        lines.append(f"\n   Answer: {q.answer}\n\n")
+        yield "\n".join(lines).encode()
+
+
+def course_zip(course: Course) -> Iterator[bytes]:
+    """Markdown notes plus flashcard and quiz CSVs, one folder per topic."""
+    def entries():
+        for i, topic in enumerate(_topics(course), 1):
+            folder = _folder(i, topic)
+            yield f"{folder}/notes.md", notes_md(topic)
+            yield f"{folder}/flashcards.csv", flashcards_csv(topic.id)
+            yield f"{folder}/quiz.csv", quiz_csv(topic.id)
+    return stream_zip(entries())
+
+
+def course_csv(course: Course) -> Iterator[bytes]:
+    """Every flashcard of the course as front,back,tags; Anki and Quizlet both import this."""
+    def rows():
+        for i, topic in enumerate(_topics(course), 1):
+            tag = _folder(i, topic)
+            for c in _flashcards(topic.id):
+                yield c.question, c.answer, tag
+    return _csv_rows(["front", "back", "tags"], rows())
+
+
+# --- Anki -----------------------------------------------------------------
+# An .apkg is a zip holding a legacy (schema 11) collection.anki2 SQLite
+# database and a "media" map. The database is built in a temp file so it
+# never sits in memory, then streamed into the zip.
+
+ANKI_SCHEMA = """
+CREATE TABLE col (id integer primary key, crt integer not null, mod integer not null,
+    scm integer not null, ver integer not null, dty integer not null, usn integer not null,
+    ls integer not null, conf text not null, models text not null, decks text not null,
+    dconf text not null, tags text not null);
+CREATE TABLE notes (id integer primary key, guid text not null, mid integer not null,
+    mod integer not null, usn integer not null, tags text not null, flds text not null,
+    sfld integer not null, csum integer not null, flags integer not null, data text not null);
+CREATE TABLE cards (id integer primary key, nid integer not null, did integer not null,
+    ord integer not null, mod integer not null, usn integer not null, type integer not null,
+    queue integer not null, due integer not null, ivl integer not null, factor integer not null,
+    reps integer not null, lapses integer not null, left integer not null, odue integer not null,
+    odid integer not null, flags integer not null, data text not null);
+CREATE TABLE revlog (id integer primary key, cid integer not null, usn integer not null,
+    ease integer not null, ivl integer not null, lastIvl integer not null,
+    factor integer not null, time integer not null, type integer not null);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+CREATE INDEX ix_notes_usn on notes (usn);
+CREATE INDEX ix_cards_usn on cards (usn);
+CREATE INDEX ix_revlog_usn on revlog (usn);
+CREATE INDEX ix_cards_nid on cards (nid);
+CREATE INDEX ix_cards_sched on cards (did, queue, due);
+CREATE INDEX ix_revlog_cid on revlog (cid);
+CREATE INDEX ix_notes_csum on notes (csum);
+"""
+
+ANKI_CONF = {
+    "activeDecks": [1], "curDeck": 1, "newSpread": 0, "collapseTime": 1200,
+    "timeLim": 0, "estTimes": True, "dueCounts": True, "curModel": None,
+    "nextPos": 1, "sortType": "noteFld", "sortBackwards": False, "addToCur": True,
+}
+
+ANKI_DCONF = {
+    "1": {
+        "id": 1, "name": "Default", "mod": 0, "usn": 0, "maxTaken": 60,
+        "autoplay": True, "timer": 0, "replayq": True, "dyn": False,
+        "new": {"delays": [1, 10], "ints": [1, 4, 7], "initialFactor": 2500,
+                "separate": True, "order": 1, "perDay": 20, "bury": False},
+        "rev": {"perDay": 200, "ease4": 1.3, "fuzz": 0.05, "minSpace": 1,
+                "ivlFct": 1, "maxIvl": 36500, "bury": False, "hardFactor": 1.2},
+        "lapse": {"delays": [10], "mult": 0, "minInt": 1, "leechFails": 8, "leechAction": 0},
+    }
+}
+
+ANKI_CSS = ".card { font-family: arial; font-size: 20px; text-align: center; }"
+
+
+def _anki_id(*parts) -> int:
+    # stable across exports, so re-importing updates notes instead of duplicating them
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=6).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _field(text: str) -> str:
+    return html.escape(text).replace("\n", "<br>")
+
+
+def _deck(did: int, name: str, now: int) -> dict:
+    return {
+        "id": did, "name": name, "desc": "", "mod": now, "usn": -1,
+        "collapsed": False, "browserCollapsed": False, "dyn": 0, "conf": 1,
+        "newToday": [0, 0], "revToday": [0, 0], "lrnToday": [0, 0], "timeToday": [0, 0],
+        "extendNew": 10, "extendRev": 50,
+    }
+
+
+def _model(mid: int, did: int, now: int) -> dict:
+    return {
+        "id": mid, "name": "Morgan Basic", "type": 0, "mod": now, "usn": -1,
+        "sortf": 0, "did": did, "tags": [], "vers": [], "css": ANKI_CSS,
+        "flds": [
+            {"name": name, "ord": i, "sticky": False, "rtl": False,
+             "font": "Arial", "size": 20, "media": []}
+            for i, name in enumerate(["Front", "Back"])
+        ],
+        "tmpls": [{
+            "name": "Card 1", "ord": 0, "did": None, "bqfmt": "", "bafmt": "",
+            "qfmt": "{{Front}}", "afmt": "{{FrontSide}}<hr id=answer>{{Back}}",
+        }],
+        "req": [[0, "all", [0]]],
+        "latexPre": (
+            "\\documentclass[12pt]{article}\n\\special{papersize=3in,5in}\n"
+            "\\usepackage{amssymb,amsmath}\n\\pagestyle{empty}\n"
+            "\\setlength{\\parindent}{0in}\n\\begin{document}\n"
+        ),
+        "latexPost": "\\end{document}",
+    }
+
+
+def _anki_notes(course: Course):
+    """(note, card) rows: flashcards as-is, quiz questions with their choices on the front."""
+    for topic in _topics(course):
+        did = _anki_id("deck", course.id, topic.id)
+        due = 0
+        for c in _flashcards(topic.id):
+            due += 1
+            yield ("flashcard", c.id), did, due, _field(c.question), _field(c.answer)
+        for q in _quiz(topic.id):
+            due += 1
+            choices = "<br>".join(f"{chr(65 + j)}. {_field(x)}" for j, x in enumerate(q.choices))
+            idx = ord(q.answer) - 65
+            back = q.answer + (f". {_field(q.choices[idx])}" if 0 <= idx < len(q.choices) else "")
+            yield ("quiz", q.id), did, due, f"{_field(q.question)}<br><br>{choices}", back
+
+
+def build_anki_collection(course: Course, path: str) -> None:
+    now = int(time.time())
+    mid = _anki_id("model", course.id)
+    root = _anki_id("deck", course.id)
+    decks = {"1": _deck(1, "Default", now), str(root): _deck(root, course.name, now)}
+    for topic in _topics(course):
+        did = _anki_id("deck", course.id, topic.id)
+        decks[str(did)] = _deck(did, f"{course.name}::{topic.name}", now)
+
+    db = sqlite3.connect(path)
+    try:
+        db.executescript(ANKI_SCHEMA)
+        db.execute(
+            "INSERT INTO col VALUES (1, ?, ?, ?, 11, 0, 0, 0, ?, ?, ?, ?, '{}')",
+            (now - now % 86400, now * 1000, now * 1000, json.dumps(ANKI_CONF),
+             json.dumps({str(mid): _model(mid, root, now)}), json.dumps(decks),
+             json.dumps(ANKI_DCONF)),
+        )
+        for key, did, due, front, back in _anki_notes(course):
+            nid = _anki_id("note", *key)
+            sfld = html.unescape(front.split("<br>")[0])
+            csum = int(hashlib.sha1(sfld.encode()).hexdigest()[:8], 16)
+            db.execute(
+                "INSERT INTO notes VALUES (?, ?, ?, ?, -1, ?, ?, ?, ?, 0, '')",
+                (nid, f"morgan-{key[0]}-{key[1]}", mid, now, f" {key[0]} ",
+                 f"{front}\x1f{back}", sfld, csum),
+            )
+            db.execute(
+                "INSERT INTO cards VALUES (?, ?, ?, 0, ?, -1, 0, 0, ?, 0, 0, 0, 0, 0, 0, 0, 0, '')",
+                (_anki_id("card", *key), nid, did, now, due),
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _read_file(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            yield chunk
+
+
+def course_apkg(course: Course) -> Iterator[bytes]:
+    """Anki deck for the course, one subdeck per topic."""
+    fd, path = tempfile.mkstemp(suffix=".anki2")
+    os.close(fd)
+    try:
+        build_anki_collection(course, path)
+        yield from stream_zip([
+            ("collection.anki2", _read_file(path)),
+            ("media", [b"{}"]),
+        ])
+    finally:
+        os.unlink(path)
+
+
+# format -> (streamer, content type, file extension)
+EXPORT_FORMATS = {
+    "zip": (course_zip, "application/zip", "zip"),
+    "csv": (course_csv, "text/csv; charset=utf-8", "csv"),
+    "apkg": (course_apkg, "application/octet-stream", "apkg"),
+}
@@ -0,0 +1,202 @@
+# backend/api/llm.py
+
+import logging
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import List
+
+from django.conf import settings
+
+from api import admission, profiling, registry
+from api.resilience import CircuitBreaker, CircuitOpen, LatencyTracker, hedged
+
+logger = logging.getLogger(__name__)
+
+
+class Pacer:
+    """Spaces calls at least ``60 / per_minute`` seconds apart across threads."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+# process-wide call rate for batch jobs (see the prewarm command);
+# web workers are governed by admission control instead
+pacer = None
+
+latency = LatencyTracker()
+breaker = CircuitBreaker(
+    error_rate=settings.LLM_BREAKER_ERROR_RATE,
+    min_calls=settings.LLM_BREAKER_MIN_CALLS,
+    cooldown=settings.LLM_BREAKER_COOLDOWN,
+)
+
+
+class StageStats:
+    """Calls, latency and tokens per pipeline stage and model, for cost/latency reports."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.lock = threading.Lock()
+        self.rows = {}
+
+    def _row(self, stage, model) -> dict:
+        return self.rows.setdefault((stage, model), {
+            "calls": 0, "seconds": deque(maxlen=self.window),
+            "prompt_tokens": 0, "completion_tokens": 0,
+        })
+
+    def record(self, stage, model, seconds: float) -> None:
+        with self.lock:
+            row = self._row(stage, model)
+            row["calls"] += 1
+            row["seconds"].append(seconds)
+
+    def add_usage(self, stage, model, usage) -> None:
+        # hedging losers cost tokens without being a call of their own
+        with self.lock:
+            row = self._row(stage, model)
+            row["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            row["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+    def report(self) -> List[dict]:
+        with self.lock:
+            rows = [(k, dict(v, seconds=sorted(v["seconds"]))) for k, v in self.rows.items()]
+        out = []
+        order = list(settings.LLM_MODELS)  # pipeline order
+        rows.sort(key=lambda r: (order.index(r[0][0]) if r[0][0] in order else len(order), r[0][1]))
+        for (stage, model), row in rows:
+            xs = row["seconds"]
+            input_price, output_price = settings.LLM_PRICES.get(model, (0, 0))
+            out.append({
+                "stage": stage, "model": model, "calls": row["calls"],
+                "p50_ms": xs[len(xs) // 2] * 1000 if xs else 0,
+                "p95_ms": xs[min(len(xs) - 1, int(len(xs) * 0.95))] * 1000 if xs else 0,
+                "prompt_tokens": row["prompt_tokens"],
+                "completion_tokens": row["completion_tokens"],
+                "cost_usd": (row["prompt_tokens"] * input_price + row["completion_tokens"] * output_price) / 1e6,
+            })
+        return out
+
+
+# per-stage totals since the process started; the prewarm command prints them
+stats = StageStats()
+
+
+def set_rate(per_minute: float = None) -> None:
+    global pacer
+    pacer = Pacer(per_minute) if per_minute else None
+
+
+def _provider_failed(e: Exception) -> bool:
+    # timeouts, connection errors, 429 and 5xx say the provider is in
+    # trouble; other 4xx mean it answered and the request was at fault
+    status = getattr(e, "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+def _call(kwargs: dict):
+    if pacer is not None:
+        pacer.wait()
+    started = time.monotonic()
+    try:
+        resp = registry.get("groq").chat.completions.create(**kwargs)
+    except Exception as e:
+        breaker.record(not _provider_failed(e))
+        raise
+    breaker.record(True)
+    latency.record((kwargs.get("model"), kwargs.get("max_tokens")), time.monotonic() - started)
+    return resp
+
+
+def _fallback(kwargs: dict):
+    """The same completion from the local Ollama model, shaped like a Groq response."""
+    options = {}
+    if kwargs.get("max_tokens"):
+        options["num_predict"] = kwargs["max_tokens"]
+    if kwargs.get("temperature") is not None:
+        options["temperature"] = kwargs["temperature"]
+    json_mode = (kwargs.get("response_format") or {}).get("type") == "json_object"
+    r = registry.get("ollama").chat(
+        model=settings.LLM_FALLBACK_MODEL, messages=kwargs["messages"],
+        options=options, format="json" if json_mode else None,
+    )
+    prompt_tokens, completion_tokens = r.prompt_eval_count or 0, r.eval_count or 0
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=r.message.content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+    )
+
+
+def _charge(resp, stage, model, user_id=None) -> None:
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        admission.charge(usage.total_tokens or 0, user_id=user_id)
+        stats.add_usage(stage, model, usage)
+
+
+def chat(stage: str = None, hedge: bool = False, **kwargs):
+    """
+    ``chat.completions.create`` on the shared Groq client that charges the
+    tokens used to the budget of the user whose admitted job is running.
+
+    ``stage`` names the pipeline step (see LLM_MODELS); it picks the model
+    unless ``model`` is passed, and labels the call's latency and tokens
+    in :data:`stats` and the request profile.
+
+    With ``hedge=True`` (independent map calls) a call slower than the
+    LLM_HEDGE_PERCENTILE of recent ones is raced against a duplicate.
+    While the circuit breaker is open calls fail fast with
+    :class:`CircuitOpen`, or go to LLM_FALLBACK_MODEL when one is set.
+    """
+    if "model" not in kwargs:
+        kwargs["model"] = settings.LLM_MODELS[stage]
+    started = time.monotonic()
+    if not breaker.allow():
+        if settings.LLM_FALLBACK_MODEL:
+            with profiling.external():
+                resp = _fallback(kwargs)
+            _record(stage, settings.LLM_FALLBACK_MODEL, resp, started)
+            return resp
+        raise CircuitOpen("LLM provider is failing; try again shortly")
+
+    delay = None
+    if hedge and breaker.state == "closed":
+        p = latency.percentile((kwargs.get("model"), kwargs.get("max_tokens")), settings.LLM_HEDGE_PERCENTILE)
+        if p is not None:
+            delay = max(p, settings.LLM_HEDGE_MIN_DELAY)
+    with profiling.external():
+        resp, losers = hedged(lambda: _call(kwargs), delay)
+    model = kwargs["model"]
+    _record(stage, model, resp, started)
+
+    # the losing copy still runs to completion and still costs tokens
+    user_id = admission.current_user()
+    for f in losers:
+        f.add_done_callback(
+            lambda f: f.exception() is None and _charge(f.result(), stage, model, user_id=user_id)
+        )
+    return resp
+
+
+def _record(stage, model, resp, started: float) -> None:
+    seconds = time.monotonic() - started
+    _charge(resp, stage, model)
+    stats.record(stage, model, seconds)
+    usage = getattr(resp, "usage", None)
+    profiling.llm_call(stage, seconds, getattr(usage, "total_tokens", 0) or 0)
@@ -0,0 +1,57 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.dedupe import dedupe
+
+TERMS = [
+    "mitosis", "meiosis", "osmosis", "diffusion", "entropy", "enthalpy",
+    "photosynthesis", "glycolysis", "ribosome", "chloroplast", "vector",
+    "matrix", "eigenvalue", "derivative", "integral", "gradient", "tensor",
+    "algorithm", "recursion", "inheritance", "polymorphism", "mutex",
+]
+TEMPLATES = [
+    "What is {a} and how does it relate to {b}?",
+    "Define {a} in the context of {b}.",
+    "Explain the difference between {a} and {b}.",
+    "Which property of {a} is used when computing {b}?",
+    "Why is {a} important for {b} in chapter {n}?",
+]
+
+
+def make_items(n: int, dup_ratio: float, rng: random.Random):
+    """Synthetic generated set where ``dup_ratio`` of items are noisy copies."""
+    items = []
+    for _ in range(n):
+        if items and rng.random() < dup_ratio:
+            q = rng.choice(items)
+            # simulate LLM rewording: prefix, casing and punctuation noise
+            q = rng.choice(["", "Q: ", "Question: "]) + q.rstrip("?.") + rng.choice(["?", ".", " ?"])
+            items.append(q.upper() if rng.random() < 0.2 else q)
+        else:
+            items.append(rng.choice(TEMPLATES).format(
+                a=rng.choice(TERMS), b=rng.choice(TERMS), n=rng.randint(1, 10_000),
+            ))
+    return items
+
+
+class Command(BaseCommand):
+    help = "Benchmark flashcard/quiz near-duplicate elimination on large generated sets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,5000,20000,50000")
+        parser.add_argument("--dup-ratio", type=float, default=0.3)
+        parser.add_argument("--threshold", type=float, default=settings.STUDY_DEDUPE_THRESHOLD)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        self.stdout.write(f"{'items':>8} {'kept':>8} {'seconds':>9} {'us/item':>9}")
+        for n in (int(s) for s in opts["sizes"].split(",")):
+            items = make_items(n, opts["dup_ratio"], rng)
+            t0 = time.perf_counter()
+            kept = dedupe(items, key=lambda s: s, threshold=opts["threshold"])
+            dt = time.perf_counter() - t0
+            self.stdout.write(f"{n:>8} {len(kept):>8} {dt:>9.3f} {dt / n * 1e6:>9.1f}")
@@ -0,0 +1,149 @@
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import llm, registry
+from api.resilience import CircuitBreaker, CircuitOpen, LatencyTracker
+
+MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+
+
+class FakeProvider(BaseHTTPRequestHandler):
+    """Groq-compatible chat endpoint that is usually fast, sometimes very slow, or down."""
+
+    base_seconds = 0.05
+    slow_share = 0.03
+    slow_seconds = 2.0
+    down = False
+    rng = random.Random(0)
+    lock = threading.Lock()
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            slow = cls.rng.random() < cls.slow_share
+        if cls.down:
+            self._send(503, {"error": {"message": "overloaded", "type": "server_error"}})
+            return
+        time.sleep(cls.slow_seconds if slow else cls.base_seconds * (0.8 + 0.4 * cls.rng.random()))
+        self._send(200, {
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+            "model": MODEL,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "note"}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+        })
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def percentile(xs, pct):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure LLM call tail latency with and without hedging, and circuit-breaker "
+        "fail-fast behaviour, against a local fake provider that injects slow responses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=400)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--slow-share", type=float, default=0.03)
+        parser.add_argument("--slow-seconds", type=float, default=2.0)
+        parser.add_argument("--hedge-min-delay", type=float, default=settings.LLM_HEDGE_MIN_DELAY)
+        parser.add_argument("--cooldown", type=float, default=2.0, help="Breaker cooldown for the outage run.")
+
+    def handle(self, *args, **opts):
+        from groq import Groq
+
+        FakeProvider.slow_share = opts["slow_share"]
+        FakeProvider.slow_seconds = opts["slow_seconds"]
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeProvider)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        registry.replace("groq", Groq(
+            api_key="bench", base_url=f"http://127.0.0.1:{server.server_port}", max_retries=0,
+        ))
+        llm.latency = LatencyTracker()
+        llm.breaker = CircuitBreaker(
+            error_rate=settings.LLM_BREAKER_ERROR_RATE,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            cooldown=opts["cooldown"],
+        )
+        hedge_min_delay = settings.LLM_HEDGE_MIN_DELAY
+        settings.LLM_HEDGE_MIN_DELAY = opts["hedge_min_delay"]
+        try:
+            self.stdout.write(
+                f"{opts['calls']} calls, {opts['concurrency']} at a time, "
+                f"{opts['slow_share']:.0%} take {opts['slow_seconds']}s\n"
+            )
+            self.stdout.write(f"{'mode':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'extra req':>9}")
+            for hedge in (False, True):
+                self.latency_run(hedge, opts["calls"], opts["concurrency"])
+            self.outage_run(opts["cooldown"])
+        finally:
+            settings.LLM_HEDGE_MIN_DELAY = hedge_min_delay
+            server.shutdown()
+
+    def call(self, hedge):
+        started = time.perf_counter()
+        llm.chat(hedge=hedge, model=MODEL, max_tokens=512,
+                 messages=[{"role": "user", "content": "chunk"}])
+        return time.perf_counter() - started
+
+    def latency_run(self, hedge, calls, concurrency):
+        FakeProvider.rng = random.Random(1)  # same slow calls in both runs
+        before = FakeProvider.requests
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            times = list(pool.map(lambda _: self.call(hedge), range(calls)))
+        extra = FakeProvider.requests - before - calls
+        ms = [t * 1000 for t in times]
+        self.stdout.write(
+            f"{'hedged' if hedge else 'plain':<10} {statistics.median(ms):>8.0f} "
+            f"{percentile(ms, 95):>8.0f} {percentile(ms, 99):>8.0f} {max(ms):>8.0f} {extra:>9}"
+        )
+
+    def outage_run(self, cooldown):
+        self.stdout.write("\nprovider returns 503:")
+        FakeProvider.down = True
+        failed = fast = 0
+        slowest_fast = 0.0
+        for _ in range(50):
+            started = time.perf_counter()
+            try:
+                self.call(False)
+            except CircuitOpen:
+                fast += 1
+                slowest_fast = max(slowest_fast, time.perf_counter() - started)
+            except Exception:
+                failed += 1
+        self.stdout.write(
+            f"  {failed} calls reached the provider, {fast} failed fast "
+            f"(slowest {slowest_fast * 1000:.2f} ms); breaker {llm.breaker.state}"
+        )
+
+        FakeProvider.down = False
+        time.sleep(cooldown)
+        self.call(False)
+        self.stdout.write(f"provider back, after {cooldown}s cooldown one probe succeeds: breaker {llm.breaker.state}")
@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ninja.renderers import JSONRenderer
+
+from api.middleware import compress, zstandard
+from api.renderers import ORJSONRenderer
+
+WORDS = (
+    "cell membrane protein enzyme gradient diffusion osmosis equilibrium "
+    "energy mitochondria nucleus ribosome transcription translation gene"
+).split()
+
+
+def sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def payloads(rng):
+    """Representative large responses: a flashcard page, a full quiz and a long summary."""
+    now = timezone.now().isoformat()
+    return {
+        "flashcards x2000": {
+            "items": [
+                {"id": i, "question": sentence(rng, 8), "answer": sentence(rng, 30)}
+                for i in range(2000)
+            ],
+            "count": 2000,
+        },
+        "quiz x500": {
+            "items": [
+                {"id": i, "question": sentence(rng, 12),
+                 "choices": [sentence(rng, 5) for _ in range(4)], "answer": "B"}
+                for i in range(500)
+            ],
+            "count": 500,
+        },
+        "summary 40k words": {"summary": "\n\n".join(sentence(rng, 40) for _ in range(1000))},
+        "topics x300": [
+            {"id": i, "name": sentence(rng, 3), "created_at": now, "progress": i % 100,
+             "file_url": f"https://res.cloudinary.com/demo/raw/upload/user_1/course_1/topic_{i}/{i:032x}.pdf"}
+            for i in range(300)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare stdlib vs orjson rendering and bytes on the wire for large API responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(0)
+        std, fast = JSONRenderer(), ORJSONRenderer()
+        encodings = ["gzip"] + (["zstd"] if zstandard else [])
+
+        head = f"{'payload':<18} {'stdlib ms':>9} {'orjson ms':>9} {'raw KB':>8}"
+        head += "".join(f" {e + ' KB':>8} {e + ' ms':>8}" for e in encodings)
+        self.stdout.write(head)
+        for name, data in payloads(rng).items():
+            t_std = self._time(lambda: std.render(None, data, response_status=200), opts["repeat"])
+            t_fast = self._time(lambda: fast.render(None, data, response_status=200), opts["repeat"])
+            body = fast.render(None, data, response_status=200)
+            row = f"{name:<18} {t_std:>9.2f} {t_fast:>9.2f} {len(body) / 1024:>8.1f}"
+            for enc in encodings:
+                t_enc = self._time(lambda: compress(body, enc), opts["repeat"])
+                row += f" {len(compress(body, enc)) / 1024:>8.1f} {t_enc:>8.2f}"
+            self.stdout.write(row)
+        self.stdout.write(
+            f"(compression applies above {settings.RESPONSE_COMPRESSION_MIN_BYTES} bytes)"
+        )
+
+    @staticmethod
+    def _time(fn, repeat):
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - t0) / repeat * 1000
@@ -0,0 +1,65 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Each probe runs in a fresh interpreter so nothing is already imported.
+PROBES = {
+    "wsgi app": "import config.wsgi",
+    "asgi app": "import config.asgi",
+    "url conf": (
+        "import django; django.setup(); "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+    "manage.py check": (
+        "from django.core.management import execute_from_command_line; "
+        "execute_from_command_line(['manage.py', 'check'])"
+    ),
+}
+HEAVY = ["groq", "ollama", "fitz", "requests", "numpy"]
+LOADED = (
+    "import sys; import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns; "
+    "print(' '.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+class Command(BaseCommand):
+    help = "Time cold worker startup (wsgi/asgi import, URL conf load, manage.py check) in fresh interpreters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--without-keys", action="store_true",
+            help="Unset GROQ_API_KEY / OLLAMA_HOST to check startup does not need them.",
+        )
+
+    def handle(self, *args, **opts):
+        env = dict(os.environ)
+        if opts["without_keys"]:
+            env.pop("GROQ_API_KEY", None)
+            env.pop("OLLAMA_HOST", None)
+        cwd = str(settings.BASE_DIR)
+
+        self.stdout.write(f"{'probe':<16} {'median ms':>10} {'min ms':>8}")
+        for name, code in PROBES.items():
+            runs = [self._run(code, env, cwd) for _ in range(opts["repeat"])]
+            self.stdout.write(f"{name:<16} {statistics.median(runs):>10.0f} {min(runs):>8.0f}")
+
+        out = subprocess.run(
+            [sys.executable, "-c", LOADED.format(heavy=HEAVY)],
+            env=env, cwd=cwd, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        self.stdout.write(f"heavy modules loaded at startup: {out or 'none'}")
+
+    def _run(self, code, env, cwd):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", code], env=env, cwd=cwd, capture_output=True, text=True)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if proc.returncode:
+            raise SystemExit(proc.stderr.strip().splitlines()[-1])
+        return elapsed
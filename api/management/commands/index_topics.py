@@ -0,0 +1,32 @@
+import requests
+from django.core.management.base import BaseCommand
+
+from api.models import Topic
+from api.routers.topics import index_topic, upload_text
+
+
+class Command(BaseCommand):
+    help = "Backfill the full-text search index for topics uploaded before it existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Re-index every topic, not only unindexed ones.")
+
+    def handle(self, *args, **opts):
+        qs = Topic.objects.exclude(file="").exclude(file__isnull=True).select_related("blob")
+        if not opts["all"]:
+            qs = qs.filter(search_vector__isnull=True)
+
+        done = 0
+        for topic in qs.iterator():
+            # text extracted at upload is reused; only older files are downloaded
+            text = topic.blob.content if topic.blob_id else None
+            if not text:
+                try:
+                    resp = requests.get(topic.file.url, timeout=30); resp.raise_for_status()
+                except Exception as e:
+                    self.stderr.write(f"topic {topic.pk}: download failed: {e}")
+                    continue
+                text = upload_text(resp.content)
+            index_topic(topic, text)
+            done += 1
+        self.stdout.write(f"Indexed {done} topic(s).")
@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import admission, llm
+from api.compression import CompressionReport
+from api.models import Blob, Flashcard, QuizQuestion, Topic
+from api.routers.topics import (
+    FLASHCARDS_VERSION, QUIZ_VERSION, SUMMARY_VERSION, build_summary, copy_shared,
+    download_file, index_topic, store_flashcards, store_quiz, stored_summary, upload_text,
+)
+from api.threads import pool_thread
+
+STAGES = ["extract", "summary", "flashcards", "quiz"]
+
+
+class _Request:
+    """Just enough of an HttpRequest for the generation helpers; file URLs are already absolute."""
+
+    def __init__(self, user):
+        self.user = user
+
+    def build_absolute_uri(self, location):
+        return location
+
+
+class Checkpoint:
+    """
+    Topics finished by an interrupted or partly failed run with the same
+    options, rewritten after every topic. Entries are (topic id, file
+    name), so a topic whose file was replaced since is done again.
+    """
+
+    def __init__(self, path: str, key: dict, fresh: bool):
+        self.path = path
+        self.key = key
+        self.lock = threading.Lock()
+        self.done = set()
+        if not fresh and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("key") == key:
+                self.done = {tuple(entry) for entry in data["done"]}
+
+    def __contains__(self, topic: Topic) -> bool:
+        return (topic.pk, topic.file.name) in self.done
+
+    def add(self, topic: Topic) -> None:
+        with self.lock:
+            self.done.add((topic.pk, topic.file.name))
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"key": self.key, "done": sorted(self.done)}, f)
+            os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        # a finished run leaves nothing to resume; the next run checks every topic again
+        with self.lock:
+            self.done.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def warm_extract(request, topic: Topic) -> bool:
+    if topic.blob_id:
+        if Blob.objects.filter(pk=topic.blob_id).exclude(content="").exists():
+            return False
+        report = CompressionReport()
+        text = upload_text(download_file(request, topic), report)
+        Blob.objects.filter(pk=topic.blob_id).update(content=text, raw_tokens=report.raw_tokens)
+    else:
+        if Topic.objects.filter(pk=topic.pk).exclude(content="").exists():
+            return False
+        text = upload_text(download_file(request, topic))
+    index_topic(topic, text)
+    return True
+
+
+def warm_summary(request, topic: Topic) -> bool:
+    if stored_summary(topic) is not None:
+        return False
+    build_summary(request, topic)
+    return True
+
+
+def warm_flashcards(request, topic: Topic) -> bool:
+    # any current set counts, including a page range the student picked
+    if topic.flashcards.filter(prompt_version=FLASHCARDS_VERSION).exists():
+        return False
+    if not copy_shared(topic, Flashcard):
+        store_flashcards(request, topic)
+    return True
+
+
+def warm_quiz(request, topic: Topic) -> bool:
+    if topic.quiz_questions.filter(prompt_version=QUIZ_VERSION).exists():
+        return False
+    if not copy_shared(topic, QuizQuestion):
+        store_quiz(request, topic)
+    return True
+
+
+WARMERS = {
+    "extract": warm_extract,
+    "summary": warm_summary,
+    "flashcards": warm_flashcards,
+    "quiz": warm_quiz,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute extraction, summaries, flashcards and quizzes for existing topics. "
+        "Skips what is already stored for the current file and prompt versions and "
+        "resumes from its checkpoint after an interruption."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, action="append", help="Only this course id (repeatable).")
+        parser.add_argument("--owner", action="append", help="Only topics of this username (repeatable).")
+        parser.add_argument("--newer-than", type=int, metavar="DAYS", help="Only topics created in the last DAYS days.")
+        parser.add_argument("--older-than", type=int, metavar="DAYS", help="Only topics created more than DAYS days ago.")
+        parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {','.join(STAGES)}.")
+        parser.add_argument("--workers", type=int, default=4, help="Topics processed in parallel.")
+        parser.add_argument("--rate", type=float, default=30, help="Max LLM calls per minute across all workers (0 = unlimited).")
+        parser.add_argument("--checkpoint", default="prewarm-checkpoint.json")
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over.")
+
+    def handle(self, *args, **opts):
+        stages = [s.strip() for s in opts["stages"].split(",") if s.strip()]
+        unknown = set(stages) - set(WARMERS)
+        if unknown:
+            raise CommandError(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+        qs = (
+            Topic.objects.exclude(file="").exclude(file__isnull=True)
+            .select_related("course__owner").order_by("pk")
+        )
+        if opts["course"]:
+            qs = qs.filter(course_id__in=opts["course"])
+        if opts["owner"]:
+            qs = qs.filter(course__owner__username__in=opts["owner"])
+        now = timezone.now()
+        if opts["newer_than"] is not None:
+            qs = qs.filter(created_at__gte=now - timedelta(days=opts["newer_than"]))
+        if opts["older_than"] is not None:
+            qs = qs.filter(created_at__lt=now - timedelta(days=opts["older_than"]))
+
+        # a checkpoint only applies to a run over the same topics, stages and prompts
+        key = {
+            "course": opts["course"], "owner": opts["owner"],
+            "newer_than": opts["newer_than"], "older_than": opts["older_than"],
+            "stages": stages, "versions": [SUMMARY_VERSION, FLASHCARDS_VERSION, QUIZ_VERSION],
+        }
+        checkpoint = Checkpoint(opts["checkpoint"], key, opts["restart"])
+        topics = [t for t in qs if t not in checkpoint]
+        if checkpoint.done:
+            self.stdout.write(f"Resuming: {len(checkpoint.done)} topic(s) already done.")
+
+        llm.set_rate(opts["rate"])
+        pool = ThreadPoolExecutor(max_workers=opts["workers"])
+        futures = {pool.submit(self.warm, t, stages): t for t in topics}
+        failed = 0
+        try:
+            for fut in as_completed(futures):
+                topic = futures[fut]
+                generated, errors = fut.result()
+                if errors:
+                    failed += 1
+                else:
+                    checkpoint.add(topic)
+                parts = [f"{s} generated" for s in generated]
+                parts += [f"{s} failed: {e}" for s, e in errors.items()]
+                self.stdout.write(f"topic {topic.pk}: {', '.join(parts) or 'already warm'}")
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise CommandError("Interrupted; run again to resume from the checkpoint.")
+        finally:
+            llm.set_rate(None)
+        pool.shutdown()
+
+        summary = f"Done: {len(topics) - failed} topic(s) warm, {failed} failed."
+        if failed:
+            summary += " Run again to retry the failed topics."
+        else:
+            checkpoint.clear()
+        self.stdout.write(summary)
+        self.report_stages()
+
+    def report_stages(self):
+        rows = llm.stats.report()
+        if not rows:
+            return
+        self.stdout.write(
+            f"\n{'stage':<11} {'model':<46} {'calls':>6} {'p50 ms':>7} {'p95 ms':>7} "
+            f"{'in tok':>9} {'out tok':>8} {'cost $':>8}"
+        )
+        for r in rows:
+            self.stdout.write(
+                f"{r['stage'] or '-':<11} {r['model']:<46} {r['calls']:>6} {r['p50_ms']:>7.0f} "
+                f"{r['p95_ms']:>7.0f} {r['prompt_tokens']:>9} {r['completion_tokens']:>8} {r['cost_usd']:>8.4f}"
+            )
+
+    @pool_thread
+    def warm(self, topic: Topic, stages):
+        request = _Request(topic.course.owner)
+        generated, errors = [], {}
+        # admission control is for web requests; this command paces itself
+        with admission.system():
+            for stage in stages:
+                try:
+                    if WARMERS[stage](request, topic):
+                        generated.append(stage)
+                except Exception as e:
+                    errors[stage] = getattr(e, "message", None) or str(e) or e.__class__.__name__
+        return generated, errors
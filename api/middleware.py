@@ -0,0 +1,127 @@
+# backend/api/middleware.py
+
+import gzip
+import logging
+import time
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from api import profiling
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+_accepts = _lazy_re_compile(r"(?:^|,)\s*([\w-]+|\*)\s*(?:;\s*q\s*=\s*([0-9.]+))?")
+COMPRESSIBLE = ("application/json", "text/")
+logger = logging.getLogger(__name__)
+
+
+def _encodings(header: str) -> dict:
+    return {m[1].lower(): float(m[2] or 1) for m in _accepts.finditer(header)}
+
+
+def choose_encoding(header: str) -> str:
+    """Best encoding we support from an Accept-Encoding header, or ''."""
+    offered = _encodings(header)
+    wildcard = offered.get("*", 0)
+    for enc in (("zstd", "gzip") if zstandard else ("gzip",)):
+        if offered.get(enc, wildcard) > 0:
+            return enc
+    return ""
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON/text responses with zstd or gzip according to the
+    client's Accept-Encoding, skipping bodies below
+    RESPONSE_COMPRESSION_MIN_BYTES where the framing costs more than it saves.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith(COMPRESSIBLE)
+            or len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if not encoding:
+            return response
+
+        body = compress(response.content, encoding)
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response["Content-Length"] = str(len(body))
+        response["Content-Encoding"] = encoding
+        # the compressed bytes are a different representation; same as
+        # Django's GZipMiddleware, keep the validator but make it weak
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Count SQL queries and their time, outbound HTTP time and total latency
+    per request, with LLM time and tokens broken down by pipeline stage.
+    With DEBUG they are returned as ``Server-Timing`` and
+    ``X-Query-Count`` headers; requests over REQUEST_QUERY_BUDGET queries
+    or REQUEST_TIME_BUDGET_MS of our own time (latency minus time spent
+    waiting on external calls) are logged. Streaming bodies are not timed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = profiling.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.stop()
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = profile.query_time * 1000
+        ext_ms = profile.external_time * 1000
+
+        if settings.DEBUG:
+            response["X-Query-Count"] = str(profile.queries)
+            timings = [
+                f'db;dur={db_ms:.1f};desc="{profile.queries} queries"',
+                f'ext;dur={ext_ms:.1f};desc="{profile.external_calls} calls"',
+            ]
+            timings += [
+                f'llm-{stage};dur={seconds * 1000:.1f};desc="{calls} calls, {tokens} tokens"'
+                for stage, (calls, seconds, tokens) in profile.llm.items()
+            ]
+            timings.append(f"total;dur={total_ms:.1f}")
+            response["Server-Timing"] = ", ".join(timings)
+
+        query_budget = settings.REQUEST_QUERY_BUDGET
+        time_budget = settings.REQUEST_TIME_BUDGET_MS
+        if (query_budget and profile.queries > query_budget) or (time_budget and total_ms - ext_ms > time_budget):
+            logger.warning(
+                "%s %s over budget: %d queries (%.0f ms), %d external calls (%.0f ms), %.0f ms total",
+                request.method, request.path, profile.queries, db_ms,
+                profile.external_calls, ext_ms, total_ms,
+            )
+        return response
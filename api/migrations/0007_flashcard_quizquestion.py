@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_topic_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Flashcard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('question', models.TextField()),
+                ('answer', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flashcards', to='api.topic')),
+            ],
+            options={
+                'ordering': ['topic', 'position'],
+                'indexes': [models.Index(fields=['topic', 'position'], name='api_flashca_topic_i_cafc34_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('question', models.TextField()),
+                ('choices', models.JSONField(default=list)),
+                ('answer', models.CharField(max_length=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_questions', to='api.topic')),
+            ],
+            options={
+                'ordering': ['topic', 'position'],
+                'indexes': [models.Index(fields=['topic', 'position'], name='api_quizque_topic_i_233e40_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_flashcard_quizquestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('model', models.CharField(max_length=100)),
+                ('dim', models.PositiveIntegerField()),
+                ('chunks', models.JSONField(default=list)),
+                ('vectors', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('topic', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='index', to='api.topic')),
+            ],
+        ),
+    ]
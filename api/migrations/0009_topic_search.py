@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:03
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_topicindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='content',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='api_topic_search__7daa4f_gin'),
+        ),
+    ]
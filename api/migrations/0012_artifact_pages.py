@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='pages',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='quizquestion',
+            name='pages',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_artifact_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='prompt_version',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='quizquestion',
+            name='prompt_version',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='Summary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('pages', models.CharField(blank=True, default='', max_length=32)),
+                ('version', models.PositiveSmallIntegerField()),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'pages', 'version'), name='unique_summary')],
+            },
+        ),
+    ]
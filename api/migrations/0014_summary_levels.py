@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_summary_prompt_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summary',
+            name='merged',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='summary',
+            name='partials',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:44
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.contrib.postgres.search import SearchVector
+
+
+def move_text_to_blobs(apps, schema_editor):
+    # blob-backed topics held a copy of the blob's text and its vector;
+    # index the text once on the blob and keep only the name on the topic
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Blob = apps.get_model("api", "Blob")
+    Topic = apps.get_model("api", "Topic")
+    # capped like api.routers.topics.index_blob: one vector past Postgres's
+    # 1 MB tsvector limit would abort the whole migration
+    Blob.objects.update(search_vector=SearchVector(
+        Substr("content", 1, settings.SEARCH_MAX_CHARS), weight="B", config="english",
+    ))
+    Topic.objects.filter(blob__isnull=False).update(
+        content="", search_vector=SearchVector(F("name"), weight="A", config="english"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_summary_levels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='blob',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='api_blob_search__502bc5_gin'),
+        ),
+        migrations.RunPython(move_text_to_blobs, migrations.RunPython.noop),
+    ]
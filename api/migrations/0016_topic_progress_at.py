@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_blob_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='progress_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
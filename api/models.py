@@ -1,9 +1,18 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 from uuid import uuid4
 from django.db import models
 from django.conf import settings
 from django.dispatch import receiver
 from django.db.models.signals import pre_delete
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from cloudinary_storage.storage import RawMediaCloudinaryStorage
+
+if TYPE_CHECKING:
+    import numpy as np  # loaded on first use, see matrix()
+
 # Example model
 
 class Item(models.Model):
@@ -21,6 +30,7 @@ class Course(models.Model):
         related_name="courses"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -38,6 +48,40 @@ def topic_upload_to(instance, filename):
     name = uuid4().hex
     return f"user_{uid}/course_{cid}/topic_{tid}/{name}.{ext}"
 
+def blob_upload_to(instance, filename):
+    """
+    Content-addressed: blobs/<sha[:2]>/<sha>.<ext>, shared by every topic
+    whose upload has the same bytes.
+    """
+    ext = filename.rsplit(".", 1)[-1]
+    return f"blobs/{instance.sha256[:2]}/{instance.sha256}.{ext}"
+
+class Blob(models.Model):
+    sha256     = models.CharField(max_length=64, unique=True)
+    file       = models.FileField(
+        upload_to=blob_upload_to,
+        storage=RawMediaCloudinaryStorage(),
+    )
+    size       = models.BigIntegerField()
+    refcount   = models.IntegerField(default=0)
+    # cleaned text, extracted once per content and reused by every owner;
+    # its search vector is likewise shared by every topic pointing here
+    content    = models.TextField(blank=True, default="")
+    search_vector = SearchVectorField(null=True, editable=False)
+    raw_tokens = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["search_vector"])]
+
+    def __str__(self):
+        return self.sha256
+
+class TopicManager(models.Manager):
+    # extracted text can be megabytes; only search touches it
+    def get_queryset(self):
+        return super().get_queryset().defer("content", "search_vector")
+
 class Topic(models.Model):
     course     = models.ForeignKey(
         "api.Course", related_name="topics", on_delete=models.CASCADE
@@ -50,15 +94,111 @@ class Topic(models.Model):
         null=True,
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     progress   = models.IntegerField(default=0)
+    # when the stored progress was reported; the write-behind flush only
+    # replaces older values (see api/progress.py)
+    progress_at = models.DateTimeField(null=True, blank=True)
+    # text and vector of legacy uploads only; blob-backed topics index
+    # just their name here and search the blob's text through ``blob``
+    content    = models.TextField(blank=True, default="")
+    search_vector = SearchVectorField(null=True, editable=False)
+    blob       = models.ForeignKey(
+        "api.Blob", related_name="topics", on_delete=models.PROTECT,
+        blank=True, null=True,
+    )
+
+    objects = TopicManager()
+
+    class Meta:
+        indexes = [GinIndex(fields=["search_vector"])]
+
+class Flashcard(models.Model):
+    topic      = models.ForeignKey(
+        "api.Topic", related_name="flashcards", on_delete=models.CASCADE
+    )
+    position   = models.PositiveIntegerField()
+    question   = models.TextField()
+    answer     = models.TextField()
+    # page range generated from, e.g. "3-7"; blank for the whole file
+    pages      = models.CharField(max_length=32, blank=True, default="")
+    prompt_version = models.PositiveSmallIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["topic", "position"]
+        indexes = [models.Index(fields=["topic", "position"])]
+
+class QuizQuestion(models.Model):
+    topic      = models.ForeignKey(
+        "api.Topic", related_name="quiz_questions", on_delete=models.CASCADE
+    )
+    position   = models.PositiveIntegerField()
+    question   = models.TextField()
+    choices    = models.JSONField(default=list)
+    answer     = models.CharField(max_length=1)
+    pages      = models.CharField(max_length=32, blank=True, default="")
+    prompt_version = models.PositiveSmallIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["topic", "position"]
+        indexes = [models.Index(fields=["topic", "position"])]
+
+class Summary(models.Model):
+    """
+    Generated study notes for a file (or a page range of it). Keyed by
+    file name, which is the content hash for blobs, so every topic with
+    the same upload shares one generation per prompt version. ``text`` is
+    the final merge; the levels below it are kept for longer views.
+    """
+    source     = models.CharField(max_length=255)
+    pages      = models.CharField(max_length=32, blank=True, default="")
+    version    = models.PositiveSmallIntegerField()
+    text       = models.TextField()
+    # intermediate levels of the map-reduce: batch merges and chunk notes
+    merged     = models.JSONField(default=list)
+    partials   = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "pages", "version"], name="unique_summary"
+            )
+        ]
+
+class TopicIndex(models.Model):
+    """Chunk embeddings of a topic file, stored as one float32 matrix."""
+    topic      = models.OneToOneField(
+        "api.Topic", related_name="index", on_delete=models.CASCADE
+    )
+    # file name the vectors were built from; a new upload gets a new name
+    source     = models.CharField(max_length=255)
+    model      = models.CharField(max_length=100)
+    dim        = models.PositiveIntegerField()
+    chunks     = models.JSONField(default=list)
+    vectors    = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def matrix(self) -> np.ndarray:
+        import numpy as np
+        return np.frombuffer(self.vectors, dtype=np.float32).reshape(-1, self.dim)
 
 @receiver(pre_delete, sender=Topic)
 def delete_topic_file(sender, instance: Topic, **kwargs):
-    if instance.file:
+    # also runs for every topic cascaded from a deleted Course
+    from api import progress
+    progress.forget(instance.pk)
+    if instance.blob_id:
+        from api.blobs import release_blob
+        release_blob(instance.blob_id)
+    elif instance.file:
+        # uploaded before content-addressed storage; owned by this topic alone
+        Summary.objects.filter(source=instance.file.name).delete()
         instance.file.delete(save=False)
 
+
 @receiver(pre_delete, sender=Course)
-def delete_course_topic_files(sender, instance: Course, **kwargs):
-    for topic in instance.topics.all():
-        if topic.file:
-            topic.file.delete(save=False)
\ No newline at end of file
+def delete_course_summary(sender, instance: Course, **kwargs):
+    Summary.objects.filter(source__startswith=f"course:{instance.pk}:").delete()
@@ -0,0 +1,121 @@
+# backend/api/profiling.py
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Per-request cost accounting for ProfilingMiddleware: SQL queries are
+# counted by a wrapper installed on every database connection, and
+# outbound HTTP (LLM, file storage) is timed by wrapping the call sites
+# in ``external()``. Work done on pool threads is not attributed.
+
+
+class Profile:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.external_calls = 0
+        self.external_time = 0.0
+        # LLM stage -> [calls, seconds, tokens]
+        self.llm = {}
+
+
+_current: ContextVar[Optional[Profile]] = ContextVar("profile", default=None)
+
+
+def start() -> Profile:
+    # connections opened before this module was imported
+    for connection in connections.all(initialized_only=True):
+        _install(None, connection)
+    profile = Profile()
+    _current.set(profile)
+    return profile
+
+
+def stop() -> None:
+    _current.set(None)
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.query_time += time.perf_counter() - started
+
+
+def _install(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install)
+
+
+@contextmanager
+def external():
+    """Time the enclosed outbound call against the current request."""
+    profile = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.external_calls += 1
+            profile.external_time += time.perf_counter() - started
+
+
+def llm_call(stage, seconds: float, tokens: int) -> None:
+    profile = _current.get()
+    if profile is not None:
+        row = profile.llm.setdefault(stage or "other", [0, 0.0, 0])
+        row[0] += 1
+        row[1] += seconds
+        row[2] += tokens
+
+
+def assert_constant_queries(fetch: Callable[[], object], add_row: Callable[[], object],
+                            rows: Iterable[int] = (1, 5)) -> None:
+    """
+    Test helper: fail when ``fetch()`` runs more queries as rows are added,
+    the signature of an N+1 (e.g. reading ``c.owner`` per course without
+    ``select_related``). ``add_row()`` creates one more row of whatever
+    ``fetch`` lists; it is called until each count in ``rows`` is reached.
+
+        assert_constant_queries(
+            lambda: self.client.get("/api/courses/", headers=auth),
+            lambda: Course.objects.create(owner=user, name="c"),
+        )
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    counts = []
+    added = 0
+    for n in sorted(rows):
+        while added < n:
+            add_row()
+            added += 1
+        with CaptureQueriesContext(connection) as ctx:
+            fetch()
+        counts.append((n, ctx.captured_queries))
+
+    (few, first), (many, last) = counts[0], counts[-1]
+    if len(last) > len(first):
+        # same statement with different literals, e.g. one lookup per row
+        shapes = Counter(re.sub(r"\b\d+\b|'[^']*'", "?", q["sql"]) for q in last)
+        sql, times = shapes.most_common(1)[0]
+        raise AssertionError(
+            f"{len(first)} queries for {few} row(s) but {len(last)} for {many}; "
+            f"most repeated ({times}x): {sql}"
+        )
@@ -0,0 +1,117 @@
+# backend/api/progress.py
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Per-process write-behind buffer for Topic.progress. Study clients ping
+# progress every few seconds; we keep only the latest value per topic and
+# write them all in one UPDATE every PROGRESS_FLUSH_INTERVAL seconds.
+# Every value carries the time it was reported and a flush only
+# overwrites older ones, so with several workers the newest report wins
+# whichever worker flushes last. Another worker's unflushed report is
+# visible after at most one flush interval.
+_lock = threading.Lock()
+_pending: Dict[int, Tuple[int, datetime]] = {}
+_owned: Dict[Tuple[int, int], float] = {}
+_flusher = None
+MAX_OWNED = 10_000
+
+
+def is_owner(user_id: int, topic_id: int) -> bool:
+    # remembered for PROGRESS_OWNER_TTL seconds; a topic deleted through
+    # another worker is only forgotten here once that runs out
+    expires = _owned.get((user_id, topic_id))
+    return expires is not None and expires > time.monotonic()
+
+
+def remember_owner(user_id: int, topic_id: int) -> None:
+    with _lock:
+        if len(_owned) >= MAX_OWNED:
+            _owned.clear()
+        _owned[(user_id, topic_id)] = time.monotonic() + settings.PROGRESS_OWNER_TTL
+
+
+def forget(topic_id: int) -> None:
+    """Drop everything held for a deleted topic."""
+    with _lock:
+        _pending.pop(topic_id, None)
+        for key in [k for k in _owned if k[1] == topic_id]:
+            del _owned[key]
+
+
+def record(topic_id: int, progress: int) -> None:
+    with _lock:
+        _pending[topic_id] = (progress, timezone.now())
+    _ensure_flusher()
+
+
+def pending(topic_id: int, default: int, stored_at: Optional[datetime] = None) -> int:
+    """
+    Progress to show for ``topic_id``: the buffered value, unless the
+    stored one (reported at ``stored_at``) is newer.
+    """
+    buffered = _pending.get(topic_id)
+    if buffered is None or (stored_at is not None and stored_at >= buffered[1]):
+        return default
+    return buffered[0]
+
+
+def flush() -> int:
+    from api.models import Topic
+
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+
+    def newer(tid, at):
+        return Q(pk=tid) & (Q(progress_at__isnull=True) | Q(progress_at__lt=at))
+
+    try:
+        Topic.objects.filter(pk__in=batch).update(
+            progress=Case(
+                *[When(newer(tid, at), then=Value(p)) for tid, (p, at) in batch.items()],
+                default=F("progress"),
+            ),
+            progress_at=Case(
+                *[When(newer(tid, at), then=Value(at)) for tid, (p, at) in batch.items()],
+                default=F("progress_at"),
+            ),
+        )
+    except Exception:
+        logger.exception("Progress flush failed; requeueing %d topics", len(batch))
+        with _lock:
+            for tid, p in batch.items():
+                _pending.setdefault(tid, p)
+        return 0
+    return len(batch)
+
+
+def _run():
+    while True:
+        time.sleep(settings.PROGRESS_FLUSH_INTERVAL)
+        close_old_connections()
+        flush()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, name="progress-flush", daemon=True)
+            _flusher.start()
+            atexit.register(flush)
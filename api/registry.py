@@ -0,0 +1,77 @@
+# backend/api/registry.py
+
+import importlib
+import threading
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+
+# Heavy clients and libraries are created on first use, once per process,
+# instead of at import time. Management commands, migrations and workers
+# that never touch the LLM stop paying for them, and a missing
+# GROQ_API_KEY only fails the requests that actually need Groq.
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def provider(name: str):
+    def register(factory):
+        _factories[name] = factory
+        return factory
+    return register
+
+
+def get(name: str) -> Any:
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _instances:
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def replace(name: str, instance: Any) -> None:
+    """Swap the shared instance, e.g. to point a benchmark at a local server."""
+    with _lock:
+        _instances[name] = instance
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+@provider("groq")
+def _groq():
+    from groq import Groq
+    return Groq(
+        api_key=settings.GROQ_API_KEY,
+        timeout=settings.LLM_TIMEOUT,
+        max_retries=settings.LLM_MAX_RETRIES,
+    )
+
+
+@provider("ollama")
+def _ollama():
+    from ollama import Client
+    return Client(host=settings.OLLAMA_HOST)
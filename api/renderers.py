@@ -0,0 +1,19 @@
+# backend/api/renderers.py
+
+import orjson
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+_fallback = NinjaJSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson. Dates, UUIDs and dataclasses are
+    native; anything else (Decimal, pydantic models, ...) goes through
+    Ninja's stock encoder so output matches the default renderer.
+    """
+    media_type = "application/json"
+
+    def render(self, request, data, *, response_status):
+        return orjson.dumps(data, default=_fallback.default, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,122 @@
+# backend/api/resilience.py
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Tail-latency tools for outbound calls: a latency tracker that says when
+# a call is slower than usual, hedging that races a duplicate against
+# such a call, and a circuit breaker that stops calling a failing backend.
+
+
+class LatencyTracker:
+    """Recent successful call latencies per key (e.g. model + max_tokens)."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+        self.samples: Dict[Hashable, Deque[float]] = {}
+
+    def record(self, key: Hashable, seconds: float) -> None:
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: Hashable, pct: float) -> Optional[float]:
+        """``pct``-th percentile latency, or ``None`` until there are enough samples."""
+        with self.lock:
+            xs = sorted(self.samples.get(key, ()))
+        if len(xs) < self.min_samples:
+            return None
+        return xs[min(len(xs) - 1, int(len(xs) * pct / 100))]
+
+
+_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+def hedged(fn: Callable[[], T], delay: Optional[float]) -> Tuple[T, List]:
+    """
+    Run ``fn``; if it has not returned after ``delay`` seconds, start a
+    second copy and return whichever succeeds first, together with the
+    still-running future(s) so the caller can account for them.
+    ``delay=None`` runs ``fn`` once, inline.
+    """
+    if delay is None:
+        return fn(), []
+    first = _pool.submit(fn)
+    try:
+        return first.result(timeout=delay), []
+    except FutureTimeout:
+        pass
+
+    pending = {first, _pool.submit(fn)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                return f.result(), list(pending)
+            error = f.exception()
+    raise error
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and outcomes are counted over the last
+    ``window`` calls. Once at least ``min_calls`` are counted and the error
+    share reaches ``error_rate`` the breaker opens and :meth:`allow`
+    refuses calls for ``cooldown`` seconds. Then a single probe is let
+    through (half-open): success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, error_rate: float, min_calls: int, cooldown: float, window: int = 50):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.probing = True
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self.lock:
+            if self.opened_at is not None:
+                if self.probing:
+                    self.probing = False
+                    if ok:
+                        self.opened_at = None
+                        self.outcomes.clear()
+                    else:
+                        self.opened_at = time.monotonic()
+                # stragglers started before the breaker opened don't count
+                return
+            self.outcomes.append(ok)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.error_rate:
+                self.opened_at = time.monotonic()
@@ -4,7 +4,7 @@ from ninja.errors import HttpError
 from django.contrib.auth.models import User
 from jwt.exceptions import ExpiredSignatureError
 from ninja.errors import HttpError
-from ninja_simple_jwt.auth.ninja_auth import HttpJwtAuth
+from api.security import JwtAuth
 
 router = Router()
 
@@ -28,7 +28,7 @@ def register(request, data: RegisterIn):
 class UserOut(Schema):
     username: str
 
-@router.get("me", response=UserOut, auth=[HttpJwtAuth()])
+@router.get("me", response=UserOut, auth=[JwtAuth()])
 def get_current_user(request):
     # pull the real User instance from request.user
     print(request)
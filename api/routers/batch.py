@@ -0,0 +1,142 @@
+# backend/api/routers/batch.py
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from ninja import Router, Schema
+from ninja.errors import HttpError
+
+from api.security import JwtAuth
+from api.threads import pool_thread
+
+router = Router(tags=["batch"], auth=[JwtAuth()])
+logger = logging.getLogger(__name__)
+
+METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+# request headers a sub-request may set; auth always comes from the batch
+FORWARDED_HEADERS = {"if-none-match": "HTTP_IF_NONE_MATCH", "accept-language": "HTTP_ACCEPT_LANGUAGE"}
+RETURNED_HEADERS = ("ETag", "Cache-Control", "Retry-After", "Content-Disposition")
+# parent META that must not leak into a sub-request
+DROPPED_META = {
+    "HTTP_AUTHORIZATION", "CONTENT_TYPE", "CONTENT_LENGTH", "QUERY_STRING",
+    "PATH_INFO", "REQUEST_METHOD", "HTTP_IF_NONE_MATCH", "HTTP_ACCEPT_ENCODING",
+}
+
+
+class SubRequestIn(Schema):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    headers: Dict[str, str] = {}
+    body: Any = None
+
+class BatchIn(Schema):
+    requests: List[SubRequestIn]
+
+class SubResponseOut(Schema):
+    id: str
+    status: int
+    headers: Dict[str, str]
+    body: Any = None
+
+class BatchOut(Schema):
+    responses: List[SubResponseOut]
+
+
+def build_subrequest(parent: HttpRequest, item: SubRequestIn) -> HttpRequest:
+    path, _, query = item.path.partition("?")
+    sub = HttpRequest()
+    sub.method = item.method
+    sub.path = sub.path_info = path
+    sub.META = {k: v for k, v in parent.META.items() if k not in DROPPED_META}
+    sub.META.update(REQUEST_METHOD=item.method, PATH_INFO=path, QUERY_STRING=query)
+    for name, value in item.headers.items():
+        key = FORWARDED_HEADERS.get(name.lower())
+        if key:
+            sub.META[key] = value
+    sub.GET = QueryDict(query)
+    sub._body = b"" if item.body is None else json.dumps(item.body).encode()
+    if item.body is not None:
+        sub.META.update(CONTENT_TYPE="application/json", CONTENT_LENGTH=str(len(sub._body)))
+    sub._set_content_type_params(sub.META)
+    sub.batch_user = parent.user
+    return sub
+
+
+def run_subrequest(parent: HttpRequest, item: SubRequestIn) -> dict:
+    result = {"id": item.id, "headers": {}, "body": None}
+    try:
+        match = resolve(item.path.partition("?")[0])
+    except Resolver404:
+        return {**result, "status": 404, "body": {"detail": "Not Found"}}
+    if match.func is getattr(parent.resolver_match, "func", None):
+        return {**result, "status": 400, "body": {"detail": "batches cannot be nested"}}
+
+    sub = build_subrequest(parent, item)
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+    except Exception:
+        # one broken call must not take the rest of the batch down
+        logger.exception("Batch sub-request %s %s failed", item.method, item.path)
+        return {**result, "status": 500, "body": {"detail": "Internal server error"}}
+
+    result["status"] = response.status_code
+    result["headers"] = {h: response[h] for h in RETURNED_HEADERS if response.has_header(h)}
+    if response.streaming:
+        result["body"] = {"detail": "streaming responses can't be batched; request this one directly"}
+    elif response.content:
+        if response.get("Content-Type", "").startswith("application/json"):
+            result["body"] = json.loads(response.content)
+        else:
+            result["body"] = response.content.decode(response.charset, "replace")
+    return result
+
+
+@pool_thread
+def _run_read(parent, item):
+    return run_subrequest(parent, item)
+
+
+@router.post("", response=BatchOut)
+def batch(request, data: BatchIn):
+    """
+    Run several API calls in one round trip, authenticated once. Runs of
+    consecutive GETs execute in parallel; any other method waits for
+    everything before it and runs alone, so writes keep their order.
+    """
+    items = data.requests
+    if len(items) > settings.BATCH_MAX_REQUESTS:
+        raise HttpError(400, f"at most {settings.BATCH_MAX_REQUESTS} requests per batch")
+    for i, item in enumerate(items):
+        item.method = item.method.upper()
+        if item.method not in METHODS:
+            raise HttpError(400, f"request {i}: unsupported method {item.method}")
+        if not item.path.startswith("/api/"):
+            raise HttpError(400, f"request {i}: path must start with /api/")
+        if item.id is None:
+            item.id = str(i)
+
+    responses = []
+    reads: List[SubRequestIn] = []
+    with ThreadPoolExecutor(max_workers=settings.BATCH_WORKERS) as pool:
+        def flush_reads():
+            if len(reads) == 1:
+                responses.append(run_subrequest(request, reads[0]))
+            elif reads:
+                responses.extend(pool.map(lambda item: _run_read(request, item), reads))
+            reads.clear()
+
+        for item in items:
+            if item.method == "GET":
+                reads.append(item)
+                continue
+            flush_reads()
+            responses.append(run_subrequest(request, item))
+        flush_reads()
+    return {"responses": responses}
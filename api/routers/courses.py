@@ -3,13 +3,17 @@
 from typing import List
 from ninja import Router, Schema
 from ninja.errors import HttpError
-from django.http import HttpResponse
-from ninja_simple_jwt.auth.ninja_auth import HttpJwtAuth
+from django.db.models import Count, Max
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.text import slugify
+from api.security import JwtAuth
 from api.models import Course
+from api.etag import conditional, make_etag
+from api.export import EXPORT_FORMATS
 
 router = Router(
     tags=["courses"],
-    auth=[HttpJwtAuth()],    
+    auth=[JwtAuth()],    
 )
 
 class CourseIn(Schema):
@@ -20,10 +24,18 @@ class CourseOut(CourseIn):
     owner: str
     created_at: str
 
+def courses_etag(request, **kwargs):
+    # any create/rename/delete moves the count or the newest updated_at
+    agg = Course.objects.filter(owner_id=request.user.id).aggregate(
+        n=Count("id"), latest=Max("updated_at")
+    )
+    return make_etag("courses", request.user.id, request.user.username, agg["n"], agg["latest"])
+
 @router.get("", response=List[CourseOut])
+@conditional(courses_etag)
 def list_courses(request):
     user = request.user
-    qs = Course.objects.filter(owner_id=user.id).order_by("-created_at")
+    qs = Course.objects.filter(owner_id=user.id).select_related("owner").order_by("-created_at")
     return [
         {
             "id": c.id,
@@ -81,4 +93,24 @@ def get_course(request, course_id: int):
         "name": c.name,
         "owner": c.owner.username,
         "created_at": c.created_at.isoformat(),
-    }
\ No newline at end of file
+    }
+@router.get("/{course_id}/export")
+def export_course(request, course_id: int, format: str = "zip"):
+    """
+    Download the course's stored summaries, flashcards and quiz for
+    offline study: ``zip`` (markdown notes + CSVs per topic), ``csv`` (all flashcards)
+    or ``apkg`` (Anki deck). Streamed topic by topic.
+    """
+    user = request.user
+    try:
+        c = Course.objects.get(id=course_id, owner_id=user.id)
+    except Course.DoesNotExist:
+        raise HttpError(404, "Course not found")
+    if format not in EXPORT_FORMATS:
+        raise HttpError(400, f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    stream, content_type, ext = EXPORT_FORMATS[format]
+    response = StreamingHttpResponse(stream(c), content_type=content_type)
+    filename = f"{slugify(c.name) or f'course-{c.id}'}.{ext}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -1,24 +1,64 @@
 # backend/api/routers/topics.py
 
-import requests, fitz
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from ninja import Router, Schema, Form, File, UploadedFile
 from ninja.errors import HttpError
-from ninja_simple_jwt.auth.ninja_auth import HttpJwtAuth
-from api.models import Topic, Course
+from ninja.pagination import paginate, PageNumberPagination
+from api.security import JwtAuth
+from pydantic import ValidationError, model_validator
+from api.models import Blob, Topic, Course, Flashcard, QuizQuestion, Summary, TopicIndex
+from api.blobs import acquire_blob, release_blob
+from api.dedupe import dedupe
+from api import llm, profiling
+from api.registry import lazy_module
+from api import progress as progress_buffer
+from api.admission import admitted, extra_slots, on_behalf_of
+from api.etag import conditional, make_etag
+from api.threads import pool_thread
+from api.embeddings import embed_texts, top_k
+from api.scoring import select_representative, split_budget
+from api.compression import (
+    CompressionReport, compress_chunk, drop_references, estimate_tokens,
+    strip_page_furniture,
+)
 from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Func, Max, Q, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Substr
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector, SearchVectorField,
+)
+import json
 import logging
 import os
-from groq import Groq, APIStatusError, APIConnectionError
 import re
 
-router = Router(tags=["topics"], auth=[HttpJwtAuth()])
+# PyMuPDF and requests are only needed once a file is actually read
+fitz = lazy_module("fitz")
+requests = lazy_module("requests")
+
+router = Router(tags=["topics"], auth=[JwtAuth()])
 logger = logging.getLogger(__name__)
-groq_client = Groq()
+SEARCH_CONFIG = "english"
+QUIZ_PER_CALL = 5
+MAX_QUIZ_COUNT = 50
+# bump when a prompt changes: clients drop cached summaries and
+# prewarm regenerates anything made with the old prompt
+SUMMARY_VERSION = 1
+FLASHCARDS_VERSION = 1
+QUIZ_VERSION = 1
+# summary views, shortest first: final merge, batch merges, chunk notes
+SUMMARY_DETAILS = ("short", "medium", "long")
 
 class SummaryOut(Schema):
     summary: str
 
+class CourseSummaryOut(SummaryOut):
+    # topics left out because their summary could not be generated
+    skipped: List[str] = []
+
 class TopicOut(Schema):
     id: int
     name: str
@@ -26,12 +66,67 @@ class TopicOut(Schema):
     created_at: str
     progress: int
 
+class BulkTopicOut(Schema):
+    filename: str
+    status: str
+    topic: Optional[TopicOut] = None
+    error: Optional[str] = None
+
 class TopicNameOut(Schema):
     id: int
     name: str
     created_at: str
 
+def topics_etag(request, course_id: int, **kwargs):
+    user = request.user
+    if not Course.objects.filter(id=course_id, owner_id=user.id).exists():
+        return None
+    rows = Topic.objects.filter(course_id=course_id).values_list("id", "updated_at", "progress", "progress_at")
+    # progress may still sit in this worker's write-behind buffer
+    versions = sorted((tid, ts, progress_buffer.pending(tid, p, at)) for tid, ts, p, at in rows)
+    return make_etag("topics", request.get_host(), versions)
+
+def artifact_etag(related: str):
+    """
+    ETag for one page of a topic's stored rows: regeneration always
+    yields new ids, and each page of the paginated list is tagged apart.
+    """
+    def etag(request, topic_id: int, **kwargs):
+        agg = Topic.objects.filter(id=topic_id, course__owner_id=request.user.id).aggregate(
+            n=Count(related), latest=Max(f"{related}__id")
+        )
+        if not agg["n"]:
+            return None
+        page = request.GET.get("page", "1"), request.GET.get("page_size", "")
+        return make_etag(related, topic_id, agg["n"], agg["latest"], *page)
+    return etag
+
+def summary_etag(request, topic_id: int, start_page: int = None, end_page: int = None,
+                 detail: str = "short", **kwargs):
+    # a new upload gets a new file name; same file + same prompts = same summary
+    name = (
+        Topic.objects.filter(id=topic_id, course__owner_id=request.user.id)
+        .values_list("file", flat=True).first()
+    )
+    if not name:
+        return None
+    return make_etag("summary", SUMMARY_VERSION, name, start_page, end_page, detail)
+
+def course_sources(course_id: int, user_id: int) -> List[str]:
+    # file names are content hashes for blobs, unique per upload otherwise
+    return sorted(
+        Topic.objects.filter(course_id=course_id, course__owner_id=user_id)
+        .exclude(file="").exclude(file__isnull=True).values_list("file", flat=True)
+    )
+
+def course_summary_etag(request, course_id: int, **kwargs):
+    sources = course_sources(course_id, request.user.id)
+    if not sources:
+        return None
+    return make_etag("course-summary", SUMMARY_VERSION, sources)
+
 @router.get("/courses/{course_id}/topics", response=List[TopicOut])
+@conditional(topics_etag)
 def list_topics(request, course_id: int):
     user = request.user
     if not user:
@@ -48,7 +143,7 @@ def list_topics(request, course_id: int):
             "name":        t.name,
             "file_url":    request.build_absolute_uri(t.file.url),
             "created_at":  t.created_at.isoformat(),
-            "progress": t.progress
+            "progress": progress_buffer.pending(t.id, t.progress, t.progress_at)
         }
         for t in course.topics.order_by("-created_at")
     ]
@@ -69,11 +164,10 @@ def create_topic(
     except Course.DoesNotExist:
         raise HttpError(404, "Course not found")
 
-    # 1) create the Topic without a file → has a valid .pk
     topic = Topic.objects.create(course=course, name=name)
-
-    # 2) now save the file so upload_to sees topic.pk
-    topic.file.save(file.name, file, save=True)
+    # identical PDFs (e.g. a whole class uploading the same lecture)
+    # share one stored file, one extraction and one set of artifacts
+    attach_upload(topic, file)
 
     return {
         "id":         topic.id,
@@ -84,6 +178,67 @@ def create_topic(
     }
 
 
+@pool_thread
+def ingest_upload(topic: Topic, uploaded) -> Optional[str]:
+    """
+    Attach ``uploaded`` to a freshly created ``topic`` on a worker thread.
+    Returns an error message instead of raising, and removes the topic
+    when the file can't be stored, so one bad file never sinks a batch.
+    """
+    try:
+        head = uploaded.read(5)
+        uploaded.seek(0)
+        if head != b"%PDF-":
+            topic.delete()
+            return "not a PDF file"
+        attach_upload(topic, uploaded)
+        return None
+    except Exception as e:
+        logger.exception("Bulk ingest failed for %s", uploaded.name)
+        topic.delete()
+        return str(e) or e.__class__.__name__
+
+
+@router.post("/courses/{course_id}/topics/bulk", response=List[BulkTopicOut])
+def bulk_create_topics(request, course_id: int, files: List[UploadedFile] = File(...)):
+    """
+    Create one topic per uploaded PDF (named after the file) and store
+    the files in parallel. Every file gets its own status.
+    """
+    user = request.user
+    try:
+        course = Course.objects.get(id=course_id, owner_id=user.id)
+    except Course.DoesNotExist:
+        raise HttpError(404, "Course not found")
+    if len(files) > settings.BULK_UPLOAD_MAX_FILES:
+        raise HttpError(400, f"at most {settings.BULK_UPLOAD_MAX_FILES} files per upload")
+
+    topics = Topic.objects.bulk_create([
+        Topic(course=course, name=os.path.splitext(f.name)[0][:255] or f.name)
+        for f in files
+    ])
+    with ThreadPoolExecutor(max_workers=settings.BULK_UPLOAD_WORKERS) as pool:
+        errors = list(pool.map(ingest_upload, topics, files))
+
+    results = []
+    for topic, f, error in zip(topics, files, errors):
+        if error:
+            results.append({"filename": f.name, "status": "failed", "error": error})
+            continue
+        results.append({
+            "filename": f.name,
+            "status": "created",
+            "topic": {
+                "id":         topic.id,
+                "name":       topic.name,
+                "file_url":   request.build_absolute_uri(topic.file.url),
+                "created_at": topic.created_at.isoformat(),
+                "progress":   topic.progress,
+            },
+        })
+    return results
+
+
 @router.patch("/topics/{topic_id}", response=TopicOut)
 def update_topic(
     request,
@@ -101,16 +256,21 @@ def update_topic(
 
     if name is not None:
         topic.name = name
-    if file is not None:
-        # this will again call upload_to with the existing topic.pk
-        topic.file.save(file.name, file, save=True)
-
     topic.save()
+
+    if file is not None:
+        attach_upload(topic, file)
+        # stored study material belongs to the old file
+        topic.flashcards.all().delete()
+        topic.quiz_questions.all().delete()
+    elif name is not None:
+        index_topic(topic)
     return {
         "id":         topic.id,
         "name":       topic.name,
         "file_url":   request.build_absolute_uri(topic.file.url),
         "created_at": topic.created_at.isoformat(),
+        "progress":   progress_buffer.pending(topic.id, topic.progress, topic.progress_at),
     }
 
 
@@ -166,39 +326,280 @@ def chunk_text(text: str, max_lines: int = 200) -> List[str]:
         if lines[i : i + max_lines]
     ]
 
-@router.get("/topics/{topic_id}/summary", response=SummaryOut)
-def summarize_topic(request, topic_id: int):
-    user = request.user
-    try:
-        topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
-    except Topic.DoesNotExist:
-        raise HttpError(404, "Topic not found")
-    if not topic.file:
-        raise HttpError(400, "No file attached")
+def pdf_to_text(data: bytes, report: CompressionReport = None) -> str:
+    doc = fitz.open(stream=data, filetype="pdf")
+    pages = [p.get_text() for p in doc]
+    if report is not None:
+        report.raw_tokens += sum(estimate_tokens(p) for p in pages)
+    # running headers, footers and page numbers repeat on every page
+    return "\n".join(strip_page_furniture(pages))
 
-    # Download PDF and extract raw text
+def page_range(start_page: int = None, end_page: int = None) -> Optional[Tuple[int, Optional[int]]]:
+    """Validate optional 1-based, inclusive page bounds; ``None`` means the whole file."""
+    if start_page is None and end_page is None:
+        return None
+    start = 1 if start_page is None else start_page
+    if start < 1 or (end_page is not None and end_page < start):
+        raise HttpError(400, "need 1 <= start_page <= end_page")
+    return start, end_page
+
+def pages_label(pages) -> str:
+    return f"{pages[0]}-{pages[1] or ''}" if pages else ""
+
+def download_file(request, topic: Topic) -> bytes:
     pdf_url = request.build_absolute_uri(topic.file.url)
-    try:
+    with profiling.external():
         resp = requests.get(pdf_url, timeout=15); resp.raise_for_status()
-        doc = fitz.open(stream=resp.content, filetype="pdf")
-        raw = "\n".join(p.get_text() for p in doc)
+    return resp.content
+
+def page_texts(request, topic: Topic, start: int, end: int = None) -> List[str]:
+    """
+    Raw text of pages ``start``..``end`` (``end=None``: to the last page).
+
+    A file's parsed pages are cached together, in the "pages" cache, under
+    its name, which changes with every upload (and is the content hash for
+    blobs), so overlapping ranges share work and only pages never seen
+    before are parsed.
+    """
+    key = f"pdf-pages:{topic.file.name}"
+    entry = caches["pages"].get(key)
+    cached = {}
+    if entry is not None:
+        total, cached = entry
+        if start > total:
+            raise HttpError(400, f"start_page is past the last page ({total})")
+        wanted = range(start, min(end or total, total) + 1)
+        if all(n in cached for n in wanted):
+            return [cached[n] for n in wanted]
+
+    try:
+        doc = fitz.open(stream=download_file(request, topic), filetype="pdf")
     except Exception as e:
         logger.exception("PDF extract failed")
         raise HttpError(502, f"PDF read error: {e}")
+    total = doc.page_count
+    if start > total:
+        raise HttpError(400, f"start_page is past the last page ({total})")
+    wanted = range(start, min(end or total, total) + 1)
+    missing = [n for n in wanted if n not in cached]
+    # keep only the pages we still need before any text is extracted
+    doc.select([n - 1 for n in missing])
+    fresh = dict(zip(missing, (p.get_text() for p in doc)))
+    cached.update(fresh)
+    caches["pages"].set(key, (total, cached))
+    return [cached[n] for n in wanted]
+
+def extract_topic_text(request, topic: Topic, report: CompressionReport = None, pages=None) -> str:
+    """
+    Cleaned text of the topic's file, or of ``pages`` (see
+    :func:`page_range`) when given.
+    """
+    if not topic.file:
+        raise HttpError(400, "No file attached")
+
+    if pages is not None:
+        raw_pages = page_texts(request, topic, *pages)
+        if report is not None:
+            report.raw_tokens += sum(estimate_tokens(p) for p in raw_pages)
+        # the student picked these pages; keep a references slide if asked for
+        full_text = clean_text("\n".join(strip_page_furniture(raw_pages)))
+    else:
+        # content-addressed uploads were extracted once, at upload time
+        if topic.blob_id:
+            blob = Blob.objects.filter(pk=topic.blob_id).values("content", "raw_tokens").first()
+            if blob and blob["content"].strip():
+                if report is not None:
+                    report.raw_tokens = blob["raw_tokens"]
+                    report.boilerplate_tokens = blob["raw_tokens"] - estimate_tokens(blob["content"])
+                return blob["content"]
+
+        # Download PDF and extract raw text
+        try:
+            raw = pdf_to_text(download_file(request, topic), report)
+        except Exception as e:
+            logger.exception("PDF extract failed")
+            raise HttpError(502, f"PDF read error: {e}")
+        full_text = drop_references(clean_text(raw))
 
-    full_text = clean_text(raw)
     if not full_text.strip():
         raise HttpError(500, "No usable text")
+    if report is not None:
+        report.boilerplate_tokens = report.raw_tokens - estimate_tokens(full_text)
+    return full_text
+
+def compress_chunks(chunks: List[str], report: CompressionReport, topic: Topic) -> List[str]:
+    """Trim low-information sentences before the LLM sees them and log the savings."""
+    ratio = settings.COMPRESSION_RATIO
+    out = [compress_chunk(c, ratio) for c in chunks]
+    report.trimmed_tokens += sum(estimate_tokens(a) - estimate_tokens(b) for a, b in zip(chunks, out))
+    logger.info(
+        "topic %s: %d raw tokens, %d boilerplate, %d trimmed, %d sent (%.0f%% saved)",
+        topic.pk, report.raw_tokens, report.boilerplate_tokens,
+        report.trimmed_tokens, report.sent_tokens, report.saved_ratio * 100,
+    )
+    return out
+
+def upload_text(data: bytes, report: CompressionReport = None) -> str:
+    # a PDF we cannot parse is still a valid upload; it just won't be searchable
+    try:
+        return drop_references(clean_text(pdf_to_text(data, report)))
+    except Exception:
+        logger.exception("PDF extract failed during indexing")
+        return ""
+
+def attach_upload(topic: Topic, uploaded) -> None:
+    """
+    Point ``topic`` at the content-addressed blob for ``uploaded``, taking
+    a reference, and index its text. Text is extracted only the first
+    time a given content is seen.
+    """
+    blob, created = acquire_blob(uploaded)
+    if created:
+        uploaded.seek(0)
+        report = CompressionReport()
+        blob.content = upload_text(uploaded.read(), report)
+        blob.raw_tokens = report.raw_tokens
+        blob.save(update_fields=["content", "raw_tokens"])
+
+    old_blob_id, old_file = topic.blob_id, topic.file.name
+    topic.blob = blob
+    topic.file = blob.file.name
+    topic.save(update_fields=["blob", "file", "updated_at"])
+    if old_blob_id:
+        release_blob(old_blob_id)
+    elif old_file:
+        Summary.objects.filter(source=old_file).delete()
+        topic.file.storage.delete(old_file)
+    # a blob seen before is already indexed
+    index_topic(topic, blob.content if created else None)
+
+def copy_shared(topic: Topic, model) -> bool:
+    """
+    Copy ``model`` rows (Flashcard/QuizQuestion) already generated for
+    another topic with the same content, so no LLM call is needed.
+    """
+    if not topic.blob_id:
+        return False
+    version = FLASHCARDS_VERSION if model is Flashcard else QUIZ_VERSION
+    # only sets made from the whole file; a page-range set is someone's subset
+    source = (
+        model.objects.filter(topic__blob_id=topic.blob_id, pages="", prompt_version=version)
+        .exclude(topic_id=topic.pk).values_list("topic_id", flat=True).first()
+    )
+    if source is None:
+        return False
+    fields = [f.name for f in model._meta.concrete_fields
+              if f.name not in ("id", "topic", "created_at")]
+    rows = model.objects.filter(topic_id=source).values(*fields)
+    with transaction.atomic():
+        Topic.objects.select_for_update().get(pk=topic.pk)
+        model.objects.filter(topic=topic).delete()
+        model.objects.bulk_create([model(topic=topic, **r) for r in rows])
+    return True
+
+def index_blob(blob_id: int, text: str) -> None:
+    """
+    Index a blob's text once for every topic that points at it. Only the
+    first SEARCH_MAX_CHARS characters are indexed, keeping the vector under
+    Postgres's 1 MB tsvector limit; a failure leaves the blob unindexed
+    rather than failing the upload.
+    """
+    try:
+        with transaction.atomic():
+            Blob.objects.filter(pk=blob_id).update(search_vector=SearchVector(
+                Value(text[:settings.SEARCH_MAX_CHARS], output_field=TextField()),
+                weight="B", config=SEARCH_CONFIG,
+            ))
+    except DatabaseError:
+        logger.exception("Search indexing failed for blob %s", blob_id)
+
+def index_topic(topic: Topic, text: str = None) -> None:
+    """
+    Refresh the topic's full-text search vector. A blob-backed topic
+    indexes only its name; ``text``, when given, goes to the shared blob.
+    For legacy uploads ``text`` replaces the topic's own stored content
+    in the same UPDATE.
+    """
+    name = SearchVector(Value(topic.name, output_field=TextField()), weight="A", config=SEARCH_CONFIG)
+    if topic.blob_id:
+        if text is not None:
+            index_blob(topic.blob_id, text)
+        Topic.objects.filter(pk=topic.pk).update(content="", search_vector=name)
+        return
+
+    if text is None:
+        content = Substr("content", 1, settings.SEARCH_MAX_CHARS)
+        fields = {}
+    else:
+        content = Value(text[:settings.SEARCH_MAX_CHARS], output_field=TextField())
+        fields = {"content": text}
+    vector = name + SearchVector(content, weight="B", config=SEARCH_CONFIG)
+    try:
+        with transaction.atomic():
+            Topic.objects.filter(pk=topic.pk).update(search_vector=vector, **fields)
+    except DatabaseError:
+        # keep the text; the topic is still found by name
+        logger.exception("Search indexing failed for topic %s", topic.pk)
+        Topic.objects.filter(pk=topic.pk).update(search_vector=name, **fields)
+
+@router.get("/topics/{topic_id}/summary", response=SummaryOut)
+@conditional(summary_etag)
+def summarize_topic(
+    request, topic_id: int, start_page: int = None, end_page: int = None, detail: str = "short",
+):
+    user = request.user
+    if detail not in SUMMARY_DETAILS:
+        raise HttpError(400, f"detail must be one of {', '.join(SUMMARY_DETAILS)}")
+    try:
+        topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
+    except Topic.DoesNotExist:
+        raise HttpError(404, "Topic not found")
+    pages = page_range(start_page, end_page)
+    return {"summary": build_summary(request, topic, pages, detail)}
+
+def stored_summary(topic: Topic, pages=None, detail: str = "short") -> Optional[str]:
+    row = (
+        Summary.objects.filter(source=topic.file.name, pages=pages_label(pages), version=SUMMARY_VERSION)
+        .values("text", "merged", "partials").first()
+    )
+    return summary_level(row, detail) if row else None
+
+def summary_level(row: dict, detail: str) -> Optional[str]:
+    if detail == "short":
+        return row["text"]
+    # rows stored before the levels were kept have none; they get rebuilt
+    level = row["merged"] if detail == "medium" else row["partials"]
+    return "\n\n".join(level) if level else None
+
+def build_summary(request, topic: Topic, pages=None, detail: str = "short") -> str:
+    """
+    Study notes for the topic's file (or ``pages`` of it), generated once
+    per file, range and prompt version and then read from the database.
+    Every level of the merge is stored, so switching ``detail`` between
+    short (final merge), medium (batch merges) and long (chunk notes)
+    costs no LLM calls.
+    """
+    stored = stored_summary(topic, pages, detail)
+    if stored is not None:
+        return stored
+    return generate_summary(request, topic, pages, detail)
+
+@admitted
+def generate_summary(request, topic: Topic, pages=None, detail: str = "short") -> str:
+    report = CompressionReport()
+    full_text = extract_topic_text(request, topic, report, pages)
 
     chunks = chunk_text(full_text, max_lines=200)
     if not chunks:
         raise HttpError(500, "Could not chunk text")
+    chunks = compress_chunks(chunks, report, topic)
 
     partials: List[str] = []
     for c in chunks:
         try:
-            resp = groq_client.chat.completions.create(
-                model="meta-llama/llama-4-maverick-17b-128e-instruct",
+            resp = llm.chat(
+                hedge=True,
+                stage="map",
                 messages=[
                     {
                         "role": "system",
@@ -228,8 +629,8 @@ You are an expert lecturer. Read the following excerpt and turn it into a struct
     for grp in batch(partials, 5):
         payload = "\n\n".join(grp)
         try:
-            m = groq_client.chat.completions.create(
-                model="meta-llama/llama-4-maverick-17b-128e-instruct",
+            m = llm.chat(
+                stage="merge",
                 messages=[
                     {
                         "role": "system",
@@ -255,8 +656,8 @@ You are an expert lecturer. Combine these segment notes into one cohesive set of
     # Final merge
     all_payload = "\n\n".join(merged)
     try:
-        final = groq_client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
+        final = llm.chat(
+            stage="final",
             messages=[
                 {
                     "role": "system",
@@ -279,47 +680,199 @@ You are an expert lecturer. Combine these segment notes into one cohesive set of
         logger.exception("GROQ final error")
         raise HttpError(502, f"GROQ final: {e}")
 
-    return {"summary": overall}
+    levels = {"text": overall, "merged": merged, "partials": partials}
+    Summary.objects.update_or_create(
+        source=topic.file.name, pages=pages_label(pages), version=SUMMARY_VERSION,
+        defaults=levels,
+    )
+    return summary_level(levels, detail)
 
-class FlashcardsOut(Schema):
-    flashcards: List[str]
+@router.get("/courses/{course_id}/summary", response=CourseSummaryOut)
+@conditional(course_summary_etag)
+def summarize_course(request, course_id: int):
+    """
+    Exam-review notes for a whole course, merged from the stored topic
+    summaries. Only missing or outdated topic summaries are generated (in
+    parallel); the merge is stored under the set of topic files, so adding
+    a topic costs one topic summary and one merge.
+    """
+    user = request.user
+    try:
+        course = Course.objects.get(id=course_id, owner_id=user.id)
+    except Course.DoesNotExist:
+        raise HttpError(404, "Course not found")
+    topics = list(
+        course.topics.exclude(file="").exclude(file__isnull=True).order_by("created_at", "id")
+    )
+    if not topics:
+        raise HttpError(400, "No topic in this course has a file")
 
+    sources = sorted(t.file.name for t in topics)
+    # one stored merge per course, replaced when its set of files changes
+    source = f"course:{course.id}:" + make_etag(sources).strip('"')
+    stored = (
+        Summary.objects.filter(source=source, pages="", version=SUMMARY_VERSION)
+        .values_list("text", flat=True).first()
+    )
+    if stored is not None:
+        return {"summary": stored}
+    return build_course_summary(request, course, topics, source)
 
-@router.get("/topics/{topic_id}/flashcards", response=FlashcardsOut)
-def generate_flashcards(request, topic_id: int):
+@admitted
+def build_course_summary(request, course: Course, topics: List[Topic], source: str) -> dict:
     user = request.user
-    try:
-        topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
-    except Topic.DoesNotExist:
-        raise HttpError(404, "Topic not found")
-    if not topic.file:
-        raise HttpError(400, "No file attached")
+    sources = [t.file.name for t in topics]
+    texts = dict(
+        Summary.objects.filter(source__in=sources, pages="", version=SUMMARY_VERSION)
+        .values_list("source", "text")
+    )
+    missing = [t for t in topics if t.file.name not in texts]
 
-    # Step 1: Extract and clean PDF text
-    pdf_url = request.build_absolute_uri(topic.file.url)
+    @pool_thread
+    def summarize(topic):
+        try:
+            with on_behalf_of(user.id):
+                return build_summary(request, topic)
+        except HttpError as e:
+            logger.warning("Course %s: no summary for topic %s: %s", course.id, topic.id, e.message)
+            return None
+
+    if missing:
+        # this request's slot plus whatever of the user's concurrency is free
+        with extra_slots(user.id, min(settings.COURSE_SUMMARY_WORKERS, len(missing)) - 1) as extra:
+            with ThreadPoolExecutor(max_workers=1 + extra) as pool:
+                for topic, text in zip(missing, pool.map(summarize, missing)):
+                    if text is not None:
+                        texts[topic.file.name] = text
+
+    parts = [texts[t.file.name] for t in topics if t.file.name in texts]
+    skipped = [t.name for t in topics if t.file.name not in texts]
+    if not parts:
+        raise HttpError(502, "Could not summarize any topic in this course")
+
+    if len(parts) == 1:
+        overall = parts[0]
+    else:
+        try:
+            final = llm.chat(
+                stage="final",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": """
+You are an expert lecturer preparing students for an exam. Combine these topic notes, given in course order, into one exam-review sheet:
+- Organize under clear headings, one section per topic.
+- Keep every key definition and formula (if there is any); drop repetition across topics.
+- Point out connections between topics where they exist.
+- Use bullet points where helpful.
+- RETURN ONLY THE NOTE NO ADDED (INTRO OR OUTRO) TEXT
+"""
+                    },
+                    {"role": "user", "content": "\n\n---\n\n".join(parts)},
+                ],
+                max_tokens=2048,
+                temperature=0.3,
+            )
+            overall = final.choices[0].message.content.strip()
+        except Exception as e:
+            logger.exception("GROQ course merge error")
+            raise HttpError(502, f"GROQ course merge: {e}")
+
+    if skipped:
+        # partial: don't store it, and don't let clients revalidate against it
+        request.etag = None
+        return {"summary": overall, "skipped": skipped}
+    with transaction.atomic():
+        Summary.objects.filter(source__startswith=f"course:{course.id}:").exclude(source=source).delete()
+        Summary.objects.update_or_create(
+            source=source, pages="", version=SUMMARY_VERSION, defaults={"text": overall},
+        )
+    return {"summary": overall}
+
+class FlashcardIn(Schema):
+    question: str
+    answer: str
+
+class FlashcardOut(FlashcardIn):
+    id: int
+
+ANSWER_LETTER = re.compile(r"^\s*([A-Za-z])\s*[.)]?\s*$")
+
+class QuizQuestionIn(Schema):
+    question: str
+    choices: List[str]
+    answer: str
+
+    @model_validator(mode="after")
+    def check_answer(self):
+        # "B", "b." or "B)" name a choice; so does the exact text of one
+        if len(self.choices) < 2:
+            raise ValueError("need at least two choices")
+        letters = [chr(ord("A") + i) for i in range(len(self.choices))]
+        m = ANSWER_LETTER.match(self.answer)
+        if m:
+            answer = m.group(1).upper()
+        else:
+            texts = [c.strip().casefold() for c in self.choices]
+            given = self.answer.strip().casefold()
+            answer = letters[texts.index(given)] if texts.count(given) == 1 else None
+        if answer not in letters:
+            raise ValueError("answer must be the letter of one of the choices")
+        self.answer = answer
+        return self
+
+class QuizQuestionOut(QuizQuestionIn):
+    id: int
+
+class GeneratedOut(Schema):
+    count: int
+
+# near-duplicate keys: a card is the same card only if its answer matches too
+def flashcard_key(fc: FlashcardIn) -> str:
+    return f"{fc.question}\n{fc.answer}"
+
+def quiz_key(q: QuizQuestionIn) -> str:
+    return "\n".join([q.question, *q.choices])
+
+def parse_items(content: str, key: str, schema) -> list:
+    """
+    Pull ``{key: [...]}`` out of a JSON completion and validate every
+    element against ``schema``. Malformed items are logged and dropped
+    so one bad card never costs us the rest of the chunk.
+    """
     try:
-        resp = requests.get(pdf_url, timeout=15); resp.raise_for_status()
-        doc = fitz.open(stream=resp.content, filetype="pdf")
-        raw = "\n".join(p.get_text() for p in doc)
-    except Exception as e:
-        logger.exception("PDF extract failed")
-        raise HttpError(502, f"PDF read error: {e}")
+        data = json.loads(content)
+    except ValueError:
+        logger.warning("GROQ returned invalid JSON for %s", key)
+        return []
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        logger.warning("GROQ JSON has no %r list", key)
+        return []
 
-    full_text = clean_text(raw)
-    if not full_text.strip():
-        raise HttpError(500, "No usable text")
+    parsed = []
+    for item in items:
+        try:
+            parsed.append(schema.model_validate(item))
+        except ValidationError as e:
+            logger.warning("Dropping invalid %s item: %s", key, e)
+    return parsed
 
+@admitted
+def store_flashcards(request, topic: Topic, pages=None) -> int:
+    report = CompressionReport()
+    full_text = extract_topic_text(request, topic, report, pages)
     chunks = chunk_text(full_text, max_lines=200)
     if not chunks:
         raise HttpError(500, "Could not chunk text")
+    chunks = compress_chunks(chunks, report, topic)
 
-    flashcard_parts: List[str] = []
-
+    cards: List[FlashcardIn] = []
     for c in chunks:
         try:
-            # Generate flashcards (Q&A pairs)
-            flashcard_resp = groq_client.chat.completions.create(
-                model="meta-llama/llama-4-maverick-17b-128e-instruct",
+            flashcard_resp = llm.chat(
+                hedge=True,
+                stage="flashcards",
                 messages=[
                     {
                         "role": "system",
@@ -327,121 +880,356 @@ def generate_flashcards(request, topic_id: int):
 You are a helpful AI tutor. Extract key concepts and generate flashcards:
 - Each card should be a simple Q&A.
 - Keep questions concise and factual.
-- Format:
-  Q: ...
-  A: ...
-- Return 10 cards.
-- Return only the flashcards, no extra text.
 - Please make it such the question is a term of the content and the answer is the definition or explanation.
+- Return 10 cards.
+- Return only JSON in exactly this shape, no extra text:
+  {"flashcards": [{"question": "...", "answer": "..."}]}
 """
                     },
                     {"role": "user", "content": c},
                 ],
-                max_tokens=512,
+                max_tokens=1024,
                 temperature=0.4,
+                response_format={"type": "json_object"},
             )
-            flashcard_parts.append(flashcard_resp.choices[0].message.content.strip())
         except Exception as e:
             logger.exception("GROQ chunk error (flashcard)")
             raise HttpError(502, f"GROQ chunk error: {e}")
+        cards.extend(parse_items(
+            flashcard_resp.choices[0].message.content, "flashcards", FlashcardIn
+        ))
 
-    all_flashcards_text = "\n\n".join(flashcard_parts)
-
-    # Optional: clean and split flashcards to structured list
-    flashcards = [fc.strip() for fc in re.split(r'\n\s*\n', all_flashcards_text) if fc.strip()]
+    if not cards:
+        raise HttpError(502, "GROQ returned no usable flashcards")
+    # neighbouring chunks repeat headers and definitions, so collapse
+    # near-identical questions before they reach the database
+    cards = dedupe(cards, key=flashcard_key, threshold=settings.STUDY_DEDUPE_THRESHOLD)
 
-    return {
-        "flashcards": flashcards,
-    }
+    with transaction.atomic():
+        Topic.objects.select_for_update().get(pk=topic.pk)
+        topic.flashcards.all().delete()
+        Flashcard.objects.bulk_create([
+            Flashcard(topic=topic, position=i, question=fc.question, answer=fc.answer,
+                      pages=pages_label(pages), prompt_version=FLASHCARDS_VERSION)
+            for i, fc in enumerate(cards)
+        ])
+    return len(cards)
 
-class QuizOut(Schema):
-    Quiz: List[str]
+def plan_quiz(full_text: str, count: int = None) -> List[tuple]:
+    """
+    Decide which chunks to send and how many problems to ask of each.
 
+    Without ``count`` every 500-line chunk is asked for 15 problems, so cost
+    grows with the document. With ``count`` we pick a fixed number of
+    representative, mutually diverse chunks locally and split the budget
+    over them, so the number of LLM calls depends only on ``count``.
+    """
+    if count is None:
+        return [(c, 15) for c in chunk_text(full_text, max_lines=500)]
 
-@router.get("/topics/{topic_id}/quiz", response=QuizOut)
-def generate_quiz(request, topic_id: int):
-    user = request.user
-    try:
-        topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
-    except Topic.DoesNotExist:
-        raise HttpError(404, "Topic not found")
-    if not topic.file:
-        raise HttpError(400, "No file attached")
-
-    pdf_url = request.build_absolute_uri(topic.file.url)
-    try:
-        resp = requests.get(pdf_url, timeout=15); resp.raise_for_status()
-        doc = fitz.open(stream=resp.content, filetype="pdf")
-        raw = "\n".join(p.get_text() for p in doc)
-    except Exception as e:
-        logger.exception("PDF extract failed")
-        raise HttpError(502, f"PDF read error: {e}")
-
-    full_text = clean_text(raw)
-    if not full_text.strip():
-        raise HttpError(500, "No usable text")
-
-    chunks = chunk_text(full_text, max_lines=500)
+    chunks = chunk_text(full_text, max_lines=100)
     if not chunks:
-        raise HttpError(500, "Could not chunk text")
+        return []
+    calls = min(len(chunks), -(-count // QUIZ_PER_CALL))
+    picked = select_representative(chunks, calls)
+    return list(zip((chunks[i] for i in picked), split_budget(count, len(picked))))
 
-    quiz_parts: List[str] = []
+@admitted
+def store_quiz(request, topic: Topic, count: int = None, pages=None) -> int:
+    report = CompressionReport()
+    full_text = extract_topic_text(request, topic, report, pages)
+    plan = plan_quiz(full_text, count)
+    if not plan:
+        raise HttpError(500, "Could not chunk text")
+    texts = compress_chunks([c for c, _ in plan], report, topic)
+    plan = [(t, n) for t, (_, n) in zip(texts, plan)]
 
-    for c in chunks:
+    questions: List[QuizQuestionIn] = []
+    for c, n in plan:
         try:
-            # Generate flashcards (Q&A pairs)
-            quiz_resp = groq_client.chat.completions.create(
-                model="meta-llama/llama-4-maverick-17b-128e-instruct",
+            quiz_resp = llm.chat(
+                hedge=True,
+                stage="quiz",
                 messages=[
                     {
                         "role": "system",
-                        "content": """
+                        "content": f"""
 You are a helpful AI tutor. Extract key concepts and generate quiz:
 - Each problem should be a simple Q&A with multiple choice answer.
 - Keep questions concise and factual.
-- Format:
-  Q: ...
-  Choices:
-    A. ...
-    B. ...
-    C. ...
-    D. ...
-  Answer:
-    A (correct answer)
-- Return 15 problems.
-- Return only the problems, no extra text.
+- Give exactly four choices per problem.
+- "answer" is the letter (A, B, C or D) of the correct choice.
+- Return {n} problems.
+- Return only JSON in exactly this shape, no extra text:
+  {{"questions": [{{"question": "...", "choices": ["...", "...", "...", "..."], "answer": "A"}}]}}
 """
                     },
                     {"role": "user", "content": c},
                 ],
-                max_tokens=512,
+                max_tokens=2048,
                 temperature=0.4,
+                response_format={"type": "json_object"},
             )
-            quiz_parts.append(quiz_resp.choices[0].message.content.strip())
         except Exception as e:
-            logger.exception("GROQ chunk error (flashcard)")
+            logger.exception("GROQ chunk error (quiz)")
             raise HttpError(502, f"GROQ chunk error: {e}")
+        questions.extend(parse_items(
+            quiz_resp.choices[0].message.content, "questions", QuizQuestionIn
+        )[:n])
 
-    all_quiz_text = "\n\n".join(quiz_parts)
+    if not questions:
+        raise HttpError(502, "GROQ returned no usable quiz questions")
+    questions = dedupe(questions, key=quiz_key, threshold=settings.STUDY_DEDUPE_THRESHOLD)
+    if count is not None:
+        questions = questions[:count]
 
-    # Optional: clean and split flashcards to structured list
-    Quiz = [fc.strip() for fc in re.split(r'\n\s*\n', all_quiz_text) if fc.strip()]
+    with transaction.atomic():
+        Topic.objects.select_for_update().get(pk=topic.pk)
+        topic.quiz_questions.all().delete()
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(
+                topic=topic, position=i, question=q.question,
+                choices=q.choices, answer=q.answer, pages=pages_label(pages),
+                prompt_version=QUIZ_VERSION,
+            )
+            for i, q in enumerate(questions)
+        ])
+    return len(questions)
 
-    return {
-        "Quiz": Quiz,
-    }
 
-class ProgressIn(Schema):
-    progress: int
+@router.get("/topics/{topic_id}/flashcards", response=List[FlashcardOut])
+@conditional(artifact_etag("flashcards"))
+@paginate(PageNumberPagination, page_size=20)
+def list_flashcards(request, topic_id: int):
+    user = request.user
+    try:
+        topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
+    except Topic.DoesNotExist:
+        raise HttpError(404, "Topic not found")
 
-@router.patch("/topics/{topic_id}/progress", response={200: dict})
-def update_progress(request, topic_id: int, data: ProgressIn):
+    # first visit generates once; every later read is a plain DB page
+    if not topic.flashcards.exists() and not copy_shared(topic, Flashcard):
+        store_flashcards(request, topic)
+    return topic.flashcards.only("id", "topic", "question", "answer")
+
+
+@router.post("/topics/{topic_id}/flashcards", response=GeneratedOut)
+def generate_flashcards(request, topic_id: int, start_page: int = None, end_page: int = None):
     user = request.user
     try:
         topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
     except Topic.DoesNotExist:
         raise HttpError(404, "Topic not found")
+    pages = page_range(start_page, end_page)
+    return {"count": store_flashcards(request, topic, pages)}
 
-    topic.completion_percentage = data.progress
-    topic.save()
-    return {"message": "Progress updated", "progress": topic.completion_percentage}
\ No newline at end of file
+
+@router.get("/topics/{topic_id}/quiz", response=List[QuizQuestionOut])
+@conditional(artifact_etag("quiz_questions"))
+@paginate(PageNumberPagination, page_size=20)
+def list_quiz(request, topic_id: int):
+    user = request.user
+    try:
+        topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
+    except Topic.DoesNotExist:
+        raise HttpError(404, "Topic not found")
+
+    if not topic.quiz_questions.exists() and not copy_shared(topic, QuizQuestion):
+        store_quiz(request, topic)
+    return topic.quiz_questions.only("id", "topic", "question", "choices", "answer")
+
+
+@router.post("/topics/{topic_id}/quiz", response=GeneratedOut)
+def generate_quiz(
+    request, topic_id: int, count: int = None, start_page: int = None, end_page: int = None,
+):
+    user = request.user
+    try:
+        topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
+    except Topic.DoesNotExist:
+        raise HttpError(404, "Topic not found")
+    if count is not None and not 1 <= count <= MAX_QUIZ_COUNT:
+        raise HttpError(400, f"count must be between 1 and {MAX_QUIZ_COUNT}")
+    pages = page_range(start_page, end_page)
+    return {"count": store_quiz(request, topic, count, pages)}
+
+class AskIn(Schema):
+    question: str
+    k: int = 4
+
+class AskOut(Schema):
+    answer: str
+    sources: List[str]
+
+def get_topic_index(request, topic: Topic) -> TopicIndex:
+    """
+    Return the embedding index for the topic's current file, building it
+    on first use. Embedding happens once per uploaded file.
+    """
+    if not topic.file:
+        raise HttpError(400, "No file attached")
+    index = TopicIndex.objects.filter(topic=topic).first()
+    if index and index.source == topic.file.name and index.model == settings.EMBEDDING_MODEL:
+        return index
+
+    # identical content uploaded elsewhere shares its file name
+    shared = (
+        TopicIndex.objects.filter(source=topic.file.name, model=settings.EMBEDDING_MODEL)
+        .exclude(topic=topic).first()
+    )
+    if shared:
+        index, _ = TopicIndex.objects.update_or_create(
+            topic=topic,
+            defaults={
+                "source":  shared.source,
+                "model":   shared.model,
+                "dim":     shared.dim,
+                "chunks":  shared.chunks,
+                "vectors": shared.vectors,
+            },
+        )
+        return index
+
+    full_text = extract_topic_text(request, topic)
+    chunks = chunk_text(full_text, max_lines=40)
+    if not chunks:
+        raise HttpError(500, "Could not chunk text")
+    try:
+        vecs = embed_texts(chunks)
+    except Exception as e:
+        logger.exception("Embedding failed")
+        raise HttpError(502, f"Embedding error: {e}")
+
+    index, _ = TopicIndex.objects.update_or_create(
+        topic=topic,
+        defaults={
+            "source":  topic.file.name,
+            "model":   settings.EMBEDDING_MODEL,
+            "dim":     vecs.shape[1],
+            "chunks":  chunks,
+            "vectors": vecs.tobytes(),
+        },
+    )
+    return index
+
+@router.post("/topics/{topic_id}/ask", response=AskOut)
+@admitted
+def ask_topic(request, topic_id: int, data: AskIn):
+    user = request.user
+    try:
+        topic = Topic.objects.get(id=topic_id, course__owner_id=user.id)
+    except Topic.DoesNotExist:
+        raise HttpError(404, "Topic not found")
+    if not data.question.strip():
+        raise HttpError(400, "Question is empty")
+
+    index = get_topic_index(request, topic)
+    try:
+        query = embed_texts([data.question])[0]
+    except Exception as e:
+        logger.exception("Embedding failed")
+        raise HttpError(502, f"Embedding error: {e}")
+
+    # only the best-matching chunks go to the LLM, not the whole document
+    hits = top_k(index.matrix(), query, max(1, min(data.k, 10)))
+    sources = [index.chunks[i] for i in hits]
+    try:
+        resp = llm.chat(
+            stage="ask",
+            messages=[
+                {
+                    "role": "system",
+                    "content": """
+You are an expert lecturer. Answer the student's question using only the excerpts provided:
+- Be concise and accurate.
+- If the excerpts do not contain the answer, say so.
+- Return _only_ the answer (no extra commentary).
+"""
+                },
+                {
+                    "role": "user",
+                    "content": "Excerpts:\n\n" + "\n\n---\n\n".join(sources)
+                               + f"\n\nQuestion: {data.question}",
+                },
+            ],
+            max_tokens=512,
+            temperature=0.2,
+        )
+        answer = resp.choices[0].message.content.strip()
+    except Exception as e:
+        logger.exception("GROQ ask error")
+        raise HttpError(502, f"GROQ ask: {e}")
+
+    return {"answer": answer, "sources": sources}
+
+class TopicSearchOut(Schema):
+    id: int
+    name: str
+    course_id: int
+    course_name: str
+    rank: float
+    snippet: str
+
+class _TopicVector(Func):
+    """A topic's own vector (name) joined with its blob's (text)."""
+    arg_joiner = " || "
+    template = "(%(expressions)s)"
+    output_field = SearchVectorField()
+
+_EMPTY_VECTOR = Cast(Value(""), SearchVectorField())
+
+@router.get("/search", response=List[TopicSearchOut])
+def search_topics(request, q: str, limit: int = 20):
+    user = request.user
+    query = SearchQuery(q, search_type="websearch", config=SEARCH_CONFIG)
+    hits = list(
+        Topic.objects
+        .filter(Q(search_vector=query) | Q(blob__search_vector=query), course__owner_id=user.id)
+        .annotate(rank=SearchRank(_TopicVector(
+            Coalesce("search_vector", _EMPTY_VECTOR), Coalesce("blob__search_vector", _EMPTY_VECTOR),
+        ), query))
+        .order_by("-rank", "-created_at")
+        .values("id", "name", "course_id", "course__name", "rank")[: max(1, min(limit, 50))]
+    )
+    if not hits:
+        return []
+
+    # ts_headline re-parses the whole document, so only run it on the page
+    # of results we return instead of on every match
+    snippets = dict(
+        Topic.objects
+        .filter(id__in=[h["id"] for h in hits])
+        .annotate(snippet=SearchHeadline(
+            Coalesce("blob__content", "content"), query, config=SEARCH_CONFIG,
+            start_sel="<b>", stop_sel="</b>", max_words=35, min_words=15,
+        ))
+        .values_list("id", "snippet")
+    )
+    return [
+        {
+            "id":          h["id"],
+            "name":        h["name"],
+            "course_id":   h["course_id"],
+            "course_name": h["course__name"],
+            "rank":        h["rank"],
+            "snippet":     snippets.get(h["id"], ""),
+        }
+        for h in hits
+    ]
+
+class ProgressIn(Schema):
+    progress: int
+
+@router.patch("/topics/{topic_id}/progress", response={200: dict})
+def update_progress(request, topic_id: int, data: ProgressIn):
+    user = request.user
+    if not 0 <= data.progress <= 100:
+        raise HttpError(400, "Progress must be between 0 and 100")
+    if not progress_buffer.is_owner(user.id, topic_id):
+        if not Topic.objects.filter(id=topic_id, course__owner_id=user.id).exists():
+            raise HttpError(404, "Topic not found")
+        progress_buffer.remember_owner(user.id, topic_id)
+
+    # buffered; written with the next periodic bulk_update
+    progress_buffer.record(topic_id, data.progress)
+    return {"message": "Progress updated", "progress": data.progress}
\ No newline at end of file
@@ -0,0 +1,87 @@
+# backend/api/scoring.py
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import List
+
+from api.registry import lazy_module
+
+np = lazy_module("numpy")
+
+_TOKEN = re.compile(r"[a-z][a-z0-9]{2,}")
+STOPWORDS = frozenset("""
+the and for are but not you all any can had her was one our out has him his how man new now
+old see two way who boy did its let put say she too use that with have this will your from
+they know want been good much some time very when come here just like long make many more
+only over such take than them well were what which their there these those then into also
+may each other about would could should where while after before because between through
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def tfidf_matrix(texts: List[str]) -> np.ndarray:
+    """
+    L2-normalised TF-IDF rows for ``texts`` (one row per text), built in
+    a single sparse-to-dense pass so scoring stays local and cheap.
+    """
+    counts = [Counter(tokenize(t)) for t in texts]
+    vocab = {}
+    for c in counts:
+        for term in c:
+            vocab.setdefault(term, len(vocab))
+    m = np.zeros((len(texts), max(len(vocab), 1)), dtype=np.float32)
+    for i, c in enumerate(counts):
+        if c:
+            m[i, [vocab[t] for t in c]] = list(c.values())
+
+    df = np.count_nonzero(m, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+    m = np.log1p(m) * idf
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def centrality(m: np.ndarray) -> np.ndarray:
+    """Cosine of each row with the document centroid: how representative it is."""
+    centroid = m.mean(axis=0)
+    norm = np.linalg.norm(centroid)
+    if norm == 0:
+        return np.zeros(len(m), dtype=np.float32)
+    return m @ (centroid / norm)
+
+
+def select_representative(texts: List[str], n: int, diversity: float = 0.5) -> List[int]:
+    """
+    Pick ``n`` indices of ``texts`` by maximal marginal relevance: high
+    centrality, penalised by similarity to chunks already picked so the
+    subset covers the document instead of one repeated section.
+    Returned in document order.
+    """
+    if n >= len(texts):
+        return list(range(len(texts)))
+    m = tfidf_matrix(texts)
+    # favour chunks with real content over near-empty title slides
+    density = np.array([len(tokenize(t)) for t in texts], dtype=np.float32)
+    relevance = centrality(m) * np.sqrt(density / max(density.max(), 1.0))
+
+    picked: List[int] = []
+    max_sim = np.zeros(len(texts), dtype=np.float32)
+    for _ in range(n):
+        score = (1 - diversity) * relevance - diversity * max_sim
+        score[picked] = -np.inf
+        best = int(np.argmax(score))
+        picked.append(best)
+        max_sim = np.maximum(max_sim, m @ m[best])
+    return sorted(picked)
+
+
+def split_budget(total: int, parts: int) -> List[int]:
+    """Spread ``total`` as evenly as possible over ``parts`` slots."""
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
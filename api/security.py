@@ -0,0 +1,19 @@
+# backend/api/security.py
+
+from ninja_simple_jwt.auth.ninja_auth import HttpJwtAuth
+
+
+class JwtAuth(HttpJwtAuth):
+    """
+    ``HttpJwtAuth`` that accepts the user already verified by an enclosing
+    batch request (see ``api/routers/batch.py``), so sub-requests don't
+    each decode and check the same token again. ``batch_user`` is only
+    ever set server-side.
+    """
+
+    def __call__(self, request):
+        user = getattr(request, "batch_user", None)
+        if user is not None:
+            request.user = user
+            return True
+        return super().__call__(request)
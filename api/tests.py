@@ -1,3 +1,549 @@
-from django.test import TestCase
+import random
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from io import BytesIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.client import encode_multipart
+from django.test import SimpleTestCase, TestCase, override_settings
+from ninja.errors import HttpError, Throttled
+from ninja_simple_jwt.jwt.token_operations import get_access_token_for_user
+from pydantic import ValidationError
+
+from api import admission, llm, progress, registry
+from api.dedupe import dedupe
+from api.etag import make_etag
+from api.management.commands.bench_llm import MODEL, FakeProvider, percentile
+from api.models import Blob, Course, Flashcard, QuizQuestion, Summary, Topic
+from api.profiling import assert_constant_queries
+from api.resilience import CircuitBreaker, LatencyTracker
+from api.routers.topics import (
+    FLASHCARDS_VERSION, QUIZ_VERSION, SUMMARY_VERSION, FlashcardIn, QuizQuestionIn, flashcard_key, page_range, page_texts,
+)
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints: a fixed number of queries however many rows they return, and per-page ETags."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw")
+        token, _ = get_access_token_for_user(self.user)
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.course = Course.objects.create(name="Bio", owner=self.user)
+        self.topic = Topic.objects.create(course=self.course, name="Cells", file="cells.pdf")
+
+    def get(self, path):
+        response = self.client.get(path, headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_courses(self):
+        assert_constant_queries(
+            lambda: self.get("/api/courses/"),
+            lambda: Course.objects.create(name="c", owner=self.user),
+        )
+
+    def test_flashcards(self):
+        assert_constant_queries(
+            lambda: self.get(f"/api/topics/{self.topic.id}/flashcards"),
+            lambda: Flashcard.objects.create(
+                topic=self.topic, position=self.topic.flashcards.count(),
+                question="q", answer="a", prompt_version=FLASHCARDS_VERSION,
+            ),
+        )
+
+    def test_quiz(self):
+        assert_constant_queries(
+            lambda: self.get(f"/api/topics/{self.topic.id}/quiz"),
+            lambda: QuizQuestion.objects.create(
+                topic=self.topic, position=self.topic.quiz_questions.count(),
+                question="q", choices=["a", "b", "c", "d"], answer="A", prompt_version=QUIZ_VERSION,
+            ),
+        )
+
+    def test_pages_have_their_own_etag(self):
+        for i in range(3):
+            Flashcard.objects.create(
+                topic=self.topic, position=i, question="q", answer="a", prompt_version=FLASHCARDS_VERSION,
+            )
+        path = f"/api/topics/{self.topic.id}/flashcards"
+        first = self.get(f"{path}?page=1&page_size=2")
+        second = self.get(f"{path}?page=2&page_size=2")
+        self.assertNotEqual(first["ETag"], second["ETag"])
+
+        response = self.client.get(f"{path}?page=2&page_size=2", headers={**self.auth, "If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 1)
+
+
+class StoredSummaryTests(TestCase):
+    """Stored summaries are read without admission, even with the token budget spent."""
+
+    def setUp(self):
+        user = User.objects.create_user("alice", password="pw")
+        token, _ = get_access_token_for_user(user)
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.course = Course.objects.create(name="Bio", owner=user)
+        self.topic = Topic.objects.create(course=self.course, name="Cells", file="cells.pdf")
+        Summary.objects.create(
+            source="cells.pdf", pages="", version=SUMMARY_VERSION,
+            text="short", merged=["medium"], partials=["long"],
+        )
+        key, _ = admission._budget_key(user.id)
+        cache.set(key, settings.LLM_USER_TOKEN_BUDGET)
+        self.addCleanup(cache.delete, key)
+
+    def test_topic_summary_levels(self):
+        for detail in ("short", "medium", "long"):
+            response = self.client.get(f"/api/topics/{self.topic.id}/summary?detail={detail}", headers=self.auth)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["summary"], detail)
+
+    def test_course_summary(self):
+        Summary.objects.create(
+            source=f"course:{self.course.id}:" + make_etag(["cells.pdf"]).strip('"'),
+            pages="", version=SUMMARY_VERSION, text="course notes",
+        )
+        response = self.client.get(f"/api/courses/{self.course.id}/summary", headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["summary"], "course notes")
+
+        self.topic.file = ""  # nothing stored for the course now: generation is admitted
+        self.topic.save()
+        Topic.objects.create(course=self.course, name="Tissues", file="tissues.pdf")
+        response = self.client.get(f"/api/courses/{self.course.id}/summary", headers=self.auth)
+        self.assertEqual(response.status_code, 429)
+
+
+class PageCacheTests(SimpleTestCase):
+    def test_page_range(self):
+        self.assertIsNone(page_range())
+        self.assertEqual(page_range(end_page=3), (1, 3))
+        for start, end in ((0, 3), (0, None), (4, 3)):
+            with self.assertRaises(HttpError):
+                page_range(start, end)
+
+    def test_long_file_is_cached_whole_and_apart_from_budgets(self):
+        import fitz
+
+        doc = fitz.open()
+        for n in range(1, 401):
+            doc.new_page().insert_text((40, 60), f"page {n}")
+        data = doc.tobytes()
+        topic = SimpleNamespace(file=SimpleNamespace(name="long.pdf"))
+        self.addCleanup(caches["pages"].clear)
+        cache.set("llm-tokens:7:0", 150000)
+        self.addCleanup(cache.delete, "llm-tokens:7:0")
+
+        with mock.patch("api.routers.topics.download_file", return_value=data) as download:
+            self.assertEqual(len(page_texts(None, topic, 1)), 400)
+            pages = page_texts(None, topic, 10, 400)
+        self.assertEqual(download.call_count, 1)
+        self.assertIn("page 400", pages[-1])
+        self.assertEqual(cache.get("llm-tokens:7:0"), 150000)
+
+
+class ExportTests(TestCase):
+    def test_notes_lead_with_the_stored_summary(self):
+        user = User.objects.create_user("alice", password="pw")
+        token, _ = get_access_token_for_user(user)
+        course = Course.objects.create(name="Bio", owner=user)
+        topic = Topic.objects.create(course=course, name="Cells", file="cells.pdf")
+        Summary.objects.create(source="cells.pdf", pages="", version=SUMMARY_VERSION, text="Cells divide.")
+        Flashcard.objects.create(topic=topic, position=0, question="q", answer="a", prompt_version=FLASHCARDS_VERSION)
+
+        response = self.client.get(f"/api/courses/{course.id}/export?format=zip",
+                                   headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as zf:
+            notes = zf.read("01-cells/notes.md").decode()
+        self.assertTrue(notes.startswith("# Cells\n\n## Summary\n\nCells divide.\n\n## Flashcards"))
+
+
+def pdf(text: str) -> bytes:
+    import fitz
+
+    doc = fitz.open()
+    doc.new_page().insert_text((40, 60), text)
+    return doc.tobytes()
+
+
+class BlobRefcountTests(TestCase):
+    """Shared uploads are stored once and removed with their last reference."""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storage = FileSystemStorage(location=location)
+        for model in (Blob, Topic):
+            patcher = mock.patch.object(model._meta.get_field("file"), "storage", storage)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # SQLite has no full-text search
+        patcher = mock.patch("api.routers.topics.index_topic")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = storage
+
+        user = User.objects.create_user("alice", password="pw")
+        token, _ = get_access_token_for_user(user)
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.course = Course.objects.create(name="Bio", owner=user)
+        self.other = Course.objects.create(name="Chem", owner=user)
+
+    def upload(self, course, data, name="notes.pdf") -> int:
+        response = self.client.post(
+            f"/api/courses/{course.id}/topics",
+            {"name": name, "file": SimpleUploadedFile(name, data, "application/pdf")},
+            headers=self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["id"]
+
+    def delete(self, path):
+        # blobs are collected once the releasing transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(path, headers=self.auth)
+        self.assertIn(response.status_code, (200, 204))
+
+    def test_shared_blob_outlives_one_owner(self):
+        data = pdf("Mitosis is cell division.")
+        first = self.upload(self.course, data, "a.pdf")
+        self.upload(self.other, data, "b.pdf")
+        blob = Blob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        Summary.objects.create(source=blob.file.name, pages="", version=SUMMARY_VERSION, text="notes")
+
+        self.delete(f"/api/topics/{first}")
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        self.assertTrue(self.storage.exists(blob.file.name))
+        self.assertTrue(Summary.objects.filter(source=blob.file.name).exists())
+
+    def test_last_reference_removes_blob_file_and_summaries(self):
+        topic_id = self.upload(self.course, pdf("Mitosis is cell division."))
+        name = Blob.objects.get().file.name
+        Summary.objects.create(source=name, pages="", version=SUMMARY_VERSION, text="notes")
+
+        self.delete(f"/api/topics/{topic_id}")
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(Summary.objects.filter(source=name).exists())
+
+    def test_replacing_the_file_releases_the_old_blob(self):
+        topic_id = self.upload(self.course, pdf("Mitosis is cell division."))
+        old = Blob.objects.get().file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/topics/{topic_id}",
+                encode_multipart("BoUnDaRy", {"file": SimpleUploadedFile("new.pdf", pdf("Osmosis moves water."))}),
+                content_type="multipart/form-data; boundary=BoUnDaRy",
+                headers=self.auth,
+            )
+        self.assertEqual(response.status_code, 200)
+        blob = Blob.objects.get()
+        self.assertNotEqual(blob.file.name, old)
+        self.assertEqual(Topic.objects.get(pk=topic_id).blob, blob)
+        self.assertFalse(self.storage.exists(old))
+
+    def test_course_delete_releases_its_topics_only(self):
+        data = pdf("Mitosis is cell division.")
+        self.upload(self.course, data, "a.pdf")
+        self.upload(self.course, pdf("Osmosis moves water."), "b.pdf")
+        kept = self.upload(self.other, data, "c.pdf")
+
+        self.delete(f"/api/courses/{self.course.id}")
+        blob = Blob.objects.get()
+        self.assertEqual(blob.refcount, 1)
+        self.assertEqual(Topic.objects.get(pk=kept).blob, blob)
+        self.assertTrue(self.storage.exists(blob.file.name))
+
+
+class BatchTests(TestCase):
+    """Sub-requests skip the token check but not the ownership checks of each view."""
+
+    def setUp(self):
+        user = User.objects.create_user("alice", password="pw")
+        token, _ = get_access_token_for_user(user)
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.course = Course.objects.create(name="Bio", owner=user)
+        mallory = User.objects.create_user("mallory", password="pw")
+        self.foreign = Course.objects.create(name="Secret", owner=mallory)
+        self.foreign_topic = Topic.objects.create(course=self.foreign, name="Plans", file="plans.pdf")
+
+    def batch(self, *requests):
+        response = self.client.post(
+            "/api/batch/", {"requests": list(requests)}, content_type="application/json", headers=self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["responses"]
+
+    def test_other_users_data_is_not_found(self):
+        for path in (
+            f"/api/courses/{self.foreign.id}",
+            f"/api/courses/{self.foreign.id}/topics",
+            f"/api/topics/{self.foreign_topic.id}",
+            f"/api/topics/{self.foreign_topic.id}/flashcards",
+        ):
+            [response] = self.batch({"path": path})
+            self.assertEqual(response["status"], 404, path)
+
+        [response] = self.batch({"method": "DELETE", "path": f"/api/topics/{self.foreign_topic.id}"})
+        self.assertEqual(response["status"], 404)
+        self.assertTrue(Topic.objects.filter(pk=self.foreign_topic.id).exists())
+
+    def test_nested_batch_is_rejected(self):
+        [response] = self.batch({"method": "POST", "path": "/api/batch/", "body": {"requests": []}})
+        self.assertEqual(response["status"], 400)
+        self.assertEqual(response["body"]["detail"], "batches cannot be nested")
+
+    def test_if_none_match_per_subrequest(self):
+        [first] = self.batch({"path": "/api/courses/"})
+        self.assertEqual(first["status"], 200)
+        etag = first["headers"]["ETag"]
+
+        [again] = self.batch({"path": "/api/courses/", "headers": {"If-None-Match": etag}})
+        self.assertEqual(again["status"], 304)
+        self.assertEqual(again["headers"]["ETag"], etag)
+
+
+class ProgressBufferTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("alice", password="pw")
+        course = Course.objects.create(name="Bio", owner=user)
+        self.topic = Topic.objects.create(course=course, name="Cells", file="cells.pdf")
+        self.addCleanup(progress._pending.clear)
+
+    def test_older_report_does_not_overwrite_newer(self):
+        progress.record(self.topic.id, 40)
+        older = progress._pending.pop(self.topic.id)
+        # another worker flushes a later report first
+        progress.record(self.topic.id, 80)
+        progress.flush()
+        progress._pending[self.topic.id] = older
+        progress.flush()
+
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.progress, 80)
+        self.assertEqual(progress.pending(self.topic.id, 80, self.topic.progress_at), 80)
+
+    def test_forgotten_on_delete(self):
+        topic_id = self.topic.id
+        progress.remember_owner(1, topic_id)
+        progress.record(topic_id, 10)
+        self.topic.file = ""  # nothing to remove from storage
+        self.topic.delete()
+        self.assertFalse(progress.is_owner(1, topic_id))
+        self.assertNotIn(topic_id, progress._pending)
+
+
+class DedupeTests(SimpleTestCase):
+    def test_questions_differing_in_a_number_are_kept(self):
+        questions = ["What is the derivative of x^2?", "What is the derivative of x^3?"]
+        self.assertEqual(dedupe(questions, key=str, threshold=0.8), questions)
+
+        cards = [
+            FlashcardIn(question="What is the derivative of x^2?", answer="2x"),
+            FlashcardIn(question="What is the derivative of x^3?", answer="3x^2"),
+        ]
+        self.assertEqual(dedupe(cards, key=flashcard_key, threshold=0.8), cards)
+
+    def test_restated_card_is_dropped(self):
+        cards = [
+            FlashcardIn(question="What is the powerhouse of the cell?", answer="Mitochondria"),
+            FlashcardIn(question="Q1: What is the powerhouse of the cell", answer="The mitochondria."),
+        ]
+        self.assertEqual(dedupe(cards, key=flashcard_key, threshold=0.8), cards[:1])
+
+
+class QuizAnswerTests(SimpleTestCase):
+    choices = ["Cell wall", "Because it divides", "Chloroplast", "Nucleus"]
+
+    def answer(self, answer):
+        return QuizQuestionIn(question="q", choices=self.choices, answer=answer).answer
+
+    def test_letters(self):
+        for given, letter in (("B", "B"), (" c. ", "C"), ("D)", "D")):
+            self.assertEqual(self.answer(given), letter)
+
+    def test_choice_text(self):
+        self.assertEqual(self.answer("Cell wall"), "A")
+        self.assertEqual(self.answer("because it divides"), "B")
+
+    def test_anything_else_is_rejected(self):
+        for given in ("", "E", "Cell", "A and B", "Mitochondria"):
+            with self.assertRaises(ValidationError):
+                self.answer(given)
+
+
+class FairSchedulerTests(SimpleTestCase):
+    def scheduler(self, slots=1, per_user=1, max_queue=10, per_user_queue=5):
+        return admission.FairScheduler(slots, per_user, max_queue, per_user_queue)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.01)
+
+    def queue(self, scheduler, user_id, granted):
+        """Start a thread waiting for a slot for ``user_id``; return once it is queued."""
+        depth = scheduler.depth
+
+        def run():
+            scheduler.acquire(user_id, timeout=5)
+            granted.append(user_id)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.wait_for(lambda: scheduler.depth == depth + 1)
+        return thread
+
+    def test_freed_slots_go_round_robin(self):
+        scheduler = self.scheduler()
+        scheduler.acquire(1, timeout=1)
+        granted = []
+        for user_id in (1, 1, 2):
+            self.queue(scheduler, user_id, granted)
+
+        holder = 1
+        for n in range(1, 4):
+            scheduler.release(holder, 0.1)
+            self.wait_for(lambda: len(granted) == n)
+            holder = granted[-1]
+        scheduler.release(holder, 0.1)
+        # a queue in arrival order would have served user 1 twice first
+        self.assertEqual(granted, [1, 2, 1])
+        self.assertEqual((scheduler.running, scheduler.depth), (0, 0))
+
+    def test_full_queues_answer_429_at_once(self):
+        scheduler = self.scheduler(max_queue=2, per_user_queue=1)
+        scheduler.acquire(1, timeout=1)
+        granted = []
+        self.queue(scheduler, 2, granted)
+
+        started = time.monotonic()
+        with self.assertRaises(Throttled):
+            scheduler.acquire(2, timeout=5)  # user 2 already has a request waiting
+        self.queue(scheduler, 3, granted)
+        with self.assertRaises(Throttled):
+            scheduler.acquire(4, timeout=5)  # the whole queue is full
+        self.assertLess(time.monotonic() - started, 1)
+
+        scheduler.release(1, 0.1)
+        self.wait_for(lambda: granted == [2])
+        scheduler.release(2, 0.1)
+        self.wait_for(lambda: granted == [2, 3])
+        scheduler.release(3, 0.1)
+
+    def test_retry_after_follows_queue_depth_and_generation_time(self):
+        scheduler = self.scheduler(slots=2, per_user=2, max_queue=1)
+        scheduler.acquire(1, timeout=1)
+        scheduler.acquire(1, timeout=1)
+        self.assertEqual(scheduler.retry_after(), 15)  # 1 / 2 slots * 30s initial estimate
+
+        granted = []
+        self.queue(scheduler, 2, granted)
+        with self.assertRaises(Throttled) as raised:
+            scheduler.acquire(3, timeout=1)
+        self.assertEqual(raised.exception.wait, 30)  # 2 / 2 slots * 30s
+
+        scheduler.release(1, 10.0)  # average moves to 0.8 * 30 + 0.2 * 10
+        self.wait_for(lambda: granted == [2])
+        self.assertEqual(scheduler.avg_seconds, 26.0)
+        self.assertEqual(scheduler.retry_after(), 13)
+
+        # waiting past the timeout gives up the place in the queue
+        with self.assertRaises(Throttled):
+            scheduler.acquire(3, timeout=0.05)
+        self.assertEqual(scheduler.depth, 0)
+        scheduler.release(1, 0.1)
+        scheduler.release(2, 0.1)
+        self.assertEqual(scheduler.running, 0)
+
+
+class FakeOllama:
+    def chat(self, **kwargs):
+        return SimpleNamespace(message=SimpleNamespace(content="local note"), prompt_eval_count=3, eval_count=2)
+
+
+class LlmResilienceTests(SimpleTestCase):
+    """Hedging and the circuit breaker against the local fake provider of ``bench_llm``."""
+
+    def setUp(self):
+        from groq import Groq
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeProvider)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        for name in ("down", "base_seconds", "slow_share", "slow_seconds"):
+            self.addCleanup(setattr, FakeProvider, name, getattr(FakeProvider, name))
+        FakeProvider.base_seconds = 0.01
+        FakeProvider.slow_share = 0.03
+        FakeProvider.slow_seconds = 1.0
+
+        saved = dict(registry._instances)
+        self.addCleanup(lambda: (registry._instances.clear(), registry._instances.update(saved)))
+        registry.replace("groq", Groq(
+            api_key="test", base_url=f"http://127.0.0.1:{server.server_port}", max_retries=0,
+        ))
+        registry.replace("ollama", FakeOllama())
+        self.addCleanup(setattr, llm, "latency", llm.latency)
+        self.addCleanup(setattr, llm, "breaker", llm.breaker)
+        llm.latency = LatencyTracker()
+
+    def call(self, hedge=False):
+        return llm.chat(hedge=hedge, model=MODEL, max_tokens=512, messages=[{"role": "user", "content": "chunk"}])
+
+    def timed_calls(self, hedge, calls=600):
+        # p99 of 600 calls tolerates a few hedges that are slow themselves
+        FakeProvider.rng = random.Random(1)  # the same slow calls in both runs
+
+        def timed(_):
+            started = time.perf_counter()
+            self.call(hedge)
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(timed, range(calls)))
+
+    @override_settings(LLM_HEDGE_PERCENTILE=90, LLM_HEDGE_MIN_DELAY=0.2)
+    def test_hedging_cuts_p99(self):
+        llm.breaker = CircuitBreaker(error_rate=0.5, min_calls=10, cooldown=30)
+        plain = self.timed_calls(hedge=False)
+        hedged = self.timed_calls(hedge=True)
+        self.assertGreaterEqual(percentile(plain, 99), FakeProvider.slow_seconds)
+        self.assertLess(percentile(hedged, 99), percentile(plain, 99) / 2)
+
+    @override_settings(LLM_FALLBACK_MODEL="llama3.1:8b")
+    def test_breaker_opens_falls_back_and_recovers(self):
+        llm.breaker = CircuitBreaker(error_rate=0.5, min_calls=5, cooldown=0.3)
+        FakeProvider.down = True
+        before = FakeProvider.requests
+        for _ in range(5):
+            with self.assertRaises(Exception):
+                self.call()
+        self.assertEqual(llm.breaker.state, "open")
+
+        # open: answered by the fallback, the provider sees nothing
+        self.assertEqual(self.call().choices[0].message.content, "local note")
+        self.assertEqual(FakeProvider.requests - before, 5)
+
+        FakeProvider.down = False
+        time.sleep(0.35)
+        self.assertEqual(llm.breaker.state, "half-open")
+        self.assertEqual(self.call().choices[0].message.content, "note")
+        self.assertEqual(llm.breaker.state, "closed")
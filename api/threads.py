@@ -0,0 +1,20 @@
+# backend/api/threads.py
+
+from functools import wraps
+
+from django.db import connections
+
+
+def pool_thread(func):
+    """
+    Decorator for work run on ``ThreadPoolExecutor`` workers. Django opens
+    a database connection per thread, so the worker's connections are
+    closed when the call returns instead of leaking one per thread.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return wrapper
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "api",
     "corsheaders",
     "ninja_simple_jwt",
@@ -55,7 +56,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "api.middleware.ProfilingMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    "api.middleware.CompressionMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     "ninja.compatibility.files.fix_request_files_middleware",
@@ -110,6 +113,12 @@ CLOUDINARY_STORAGE = {
 
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.RawMediaCloudinaryStorage"
 
+# Uploads are SHA-256 hashed as they stream in, for content-addressed storage.
+FILE_UPLOAD_HANDLERS = [
+    "api.uploadhandlers.HashingMemoryFileUploadHandler",
+    "api.uploadhandlers.HashingTemporaryFileUploadHandler",
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -168,4 +177,107 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
 
 APPEND_SLASH = False
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
\ No newline at end of file
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+# Jaccard similarity above which generated flashcards/quiz questions
+# are treated as duplicates (1.0 disables deduplication).
+STUDY_DEDUPE_THRESHOLD = float(os.getenv("STUDY_DEDUPE_THRESHOLD", "0.8"))
+
+# Local embedding model used for retrieval over topic chunks.
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+
+# Share of each chunk's tokens kept by extractive compression before it
+# is sent to the LLM (1.0 sends chunks untrimmed).
+COMPRESSION_RATIO = float(os.getenv("COMPRESSION_RATIO", "0.7"))
+
+# Seconds between write-behind flushes of buffered topic progress.
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "10"))
+# Seconds a worker remembers that a user owns a topic before checking again.
+PROGRESS_OWNER_TTL = float(os.getenv("PROGRESS_OWNER_TTL", "300"))
+
+# Response compression (zstd when the client accepts it, else gzip).
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Admission control for LLM-backed endpoints. Slots and queues are counted
+# per worker process; with N workers a user may run N x LLM_USER_CONCURRENCY.
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+LLM_USER_CONCURRENCY = int(os.getenv("LLM_USER_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_USER_QUEUE = int(os.getenv("LLM_USER_QUEUE", "4"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))
+# Token quota per user and window; kept in the default cache, which is
+# per-process memory unless CACHES points at a shared backend, in which
+# case it is enforced across workers.
+LLM_USER_TOKEN_BUDGET = int(os.getenv("LLM_USER_TOKEN_BUDGET", "200000"))
+LLM_BUDGET_WINDOW = int(os.getenv("LLM_BUDGET_WINDOW", "3600"))
+
+# Bulk topic upload: files per request and parallel ingest threads.
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "50"))
+BULK_UPLOAD_WORKERS = int(os.getenv("BULK_UPLOAD_WORKERS", "4"))
+
+# Tail-latency control for LLM calls. Map calls slower than the given
+# percentile of recent latencies are hedged with a duplicate request;
+# once the error share of recent calls reaches LLM_BREAKER_ERROR_RATE the
+# circuit breaker fails fast (or uses the local Ollama LLM_FALLBACK_MODEL,
+# e.g. "llama3.1:8b") for LLM_BREAKER_COOLDOWN seconds.
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")
+
+# POST /api/batch/: sub-requests per batch and threads for parallel reads.
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+# Per-request profiling (api.middleware.ProfilingMiddleware): requests over
+# either budget are logged; 0 disables a budget. Time excludes waiting on
+# external calls such as the LLM.
+REQUEST_QUERY_BUDGET = int(os.getenv("REQUEST_QUERY_BUDGET", "30"))
+REQUEST_TIME_BUDGET_MS = float(os.getenv("REQUEST_TIME_BUDGET_MS", "500"))
+
+# Course summaries: missing topic summaries are generated in parallel, on at
+# most this many threads and never more than the user's free LLM_USER_CONCURRENCY.
+COURSE_SUMMARY_WORKERS = int(os.getenv("COURSE_SUMMARY_WORKERS", "3"))
+
+# "pages" holds parsed PDF page text, one entry per file, apart from the
+# default cache so large files cannot evict the LLM token budgets. Point
+# both at a shared backend to share them across workers.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "pages": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pdf-pages",
+        "TIMEOUT": 60 * 60 * 24 * 7,
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("PAGE_CACHE_FILES", "100"))},
+    },
+}
+
+# Characters of extracted text indexed for full-text search. Postgres caps a
+# tsvector at 1 MB; the rest of a very long document is not searchable.
+SEARCH_MAX_CHARS = int(os.getenv("SEARCH_MAX_CHARS", "500000"))
+
+# Groq model per LLM pipeline stage: per-chunk notes (map), batch merges
+# (merge), the final merge of topic and course summaries (final),
+# flashcards, quiz and ask. The map stage runs once per chunk and the
+# notes are merged afterwards, so a small fast model does.
+_LARGE_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+LLM_MODELS = {
+    "map":        os.getenv("LLM_MODEL_MAP", "llama-3.1-8b-instant"),
+    "merge":      os.getenv("LLM_MODEL_MERGE", _LARGE_MODEL),
+    "final":      os.getenv("LLM_MODEL_FINAL", _LARGE_MODEL),
+    "flashcards": os.getenv("LLM_MODEL_FLASHCARDS", _LARGE_MODEL),
+    "quiz":       os.getenv("LLM_MODEL_QUIZ", _LARGE_MODEL),
+    "ask":        os.getenv("LLM_MODEL_ASK", _LARGE_MODEL),
+}
+# USD per million (input, output) tokens, for the per-stage cost report.
+LLM_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    _LARGE_MODEL: (0.20, 0.60),
+}